@@ -1,9 +1,9 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 # SocketIO removed - using simple HTTP requests instead
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import os
 from dotenv import load_dotenv
 import pandas as pd
@@ -11,8 +11,9 @@ import io
 import csv
 import secrets
 import re
+import time
 from authlib.integrations.flask_client import OAuth
-from services.ai_service import AIAssistant
+from services.ai_service import get_ai_assistant
 from sqlalchemy import text
 
 # Load environment variables
@@ -244,11 +245,15 @@ try:
     # Azure SQL Database specific optimizations
     if 'mssql' in database_url or 'sqlserver' in database_url:
         app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-            'pool_size': 10,
-            'max_overflow': 20,
+            'pool_size': 20,
+            'max_overflow': 10,
             'pool_timeout': 30,
-            'pool_recycle': 1800,  # 30 minutes for Azure
-            'pool_pre_ping': True,
+            # Recycle before Azure's 30 minute idle disconnect instead of
+            # pinging the server with SELECT 1 on every checkout
+            'pool_recycle': 1500,
+            'pool_pre_ping': False,
+            'query_cache_size': 1200,  # Headroom for migration/metadata statements
+            'fast_executemany': True,  # pyodbc array binding for bulk inserts (CSV import)
             'connect_args': {
                 'timeout': 30,
                 'autocommit': False,
@@ -290,7 +295,7 @@ def fix_database_schema():
         
         # Check current columns
         inspector = inspect(db.engine)
-        columns = [col['name'] for col in inspector.get_columns('task')]
+        columns = frozenset(col['name'] for col in inspector.get_columns('task'))
         
         # Check if workflow columns are missing
         workflow_columns = ['workflow_status', 'started_at', 'committed_at', 'completed_at']
@@ -655,7 +660,7 @@ class Label(db.Model):
     name = db.Column(db.String(100), nullable=False)
     color = db.Column(db.String(7), default='#3B82F6')  # Hex color code
     icon = db.Column(db.String(50), default='fas fa-tag')  # FontAwesome icon class
-    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -665,7 +670,7 @@ class Label(db.Model):
 class TaskLabel(db.Model):
     __tablename__ = 'task_labels'
     task_id = db.Column(db.Integer, db.ForeignKey('task.id'), primary_key=True)
-    label_id = db.Column(db.Integer, db.ForeignKey('label.id'), primary_key=True)
+    label_id = db.Column(db.Integer, db.ForeignKey('label.id'), primary_key=True, index=True)  # PK leads with task_id
 
 class DiscussionComment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -760,27 +765,32 @@ class Task(db.Model):
     dependencies = db.relationship('TaskDependency', foreign_keys='TaskDependency.task_id', back_populates='task')
     dependents = db.relationship('TaskDependency', foreign_keys='TaskDependency.depends_on_id', back_populates='depends_on')
     
+    # Columns already confirmed in the database. Migrations only ever add task
+    # columns, so a positive answer never needs to be reflected again.
+    _confirmed_columns = frozenset()
+    
     @classmethod
-    def has_assignment_fields(cls):
-        """Check if task assignment fields are available in the database"""
+    def _has_columns(cls, names):
+        """Check if all named columns exist, reflecting the table only on a cache miss"""
+        if cls._confirmed_columns.issuperset(names):
+            return True
         try:
             from sqlalchemy import inspect
             inspector = inspect(db.engine)
-            columns = [col['name'] for col in inspector.get_columns('task')]
-            return all(field in columns for field in ['assigned_to', 'assigned_by', 'assigned_at'])
+            cls._confirmed_columns = frozenset(col['name'] for col in inspector.get_columns('task'))
+            return cls._confirmed_columns.issuperset(names)
         except Exception:
             return False
     
+    @classmethod
+    def has_assignment_fields(cls):
+        """Check if task assignment fields are available in the database"""
+        return cls._has_columns(('assigned_to', 'assigned_by', 'assigned_at'))
+    
     @classmethod
     def has_workflow_fields(cls):
         """Check if task workflow fields are available in the database"""
-        try:
-            from sqlalchemy import inspect
-            inspector = inspect(db.engine)
-            columns = [col['name'] for col in inspector.get_columns('task')]
-            return all(field in columns for field in ['workflow_status', 'started_at', 'committed_at', 'completed_at'])
-        except Exception:
-            return False
+        return cls._has_columns(('workflow_status', 'started_at', 'committed_at', 'completed_at'))
     
     def can_start(self):
         """Check if task can be started (must be in backlog)"""
@@ -1187,6 +1197,9 @@ login_manager.init_app(app)
 login_manager.login_view = 'login'
 
 # Initialize OAuth
+# Endpoints are configured explicitly so authlib never fetches discovery documents
+GOOGLE_USERINFO_URL = 'https://www.googleapis.com/oauth2/v2/userinfo'
+
 oauth = OAuth(app)
 google = oauth.register(
     name='google',
@@ -1195,6 +1208,7 @@ google = oauth.register(
     authorize_url='https://accounts.google.com/o/oauth2/auth',
     access_token_url='https://oauth2.googleapis.com/token',
     jwks_uri='https://www.googleapis.com/oauth2/v3/certs',
+    userinfo_endpoint=GOOGLE_USERINFO_URL,
     client_kwargs={
         'scope': 'openid email profile'
     }
@@ -1252,6 +1266,10 @@ except Exception as e:
 
 # SocketIO handlers removed - using simple HTTP requests instead
 
+# Password hashing: scrypt (OpenSSL-backed) verifies in a fraction of the CPU time
+# of the pbkdf2:sha256 hashes older accounts were created with
+PASSWORD_HASH_METHOD = 'scrypt:32768:8:1'
+
 # Routes
 @app.route('/')
 def index():
@@ -1264,9 +1282,14 @@ def login():
     if request.method == 'POST':
         email = request.form['email']
         password = request.form['password']
-        user = User.query.filter_by(email=email).first()
+        user = _find_user_by_email(email)
         
         if user and user.password_hash and check_password_hash(user.password_hash, password):
+            # Re-hash legacy pbkdf2 hashes so later logins use the cheaper scrypt check
+            if not user.password_hash.startswith(PASSWORD_HASH_METHOD):
+                user.password_hash = generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+                db.session.commit()
+            
             login_user(user)
             
             # Check for pending sharing token
@@ -1277,6 +1300,7 @@ def login():
                     from services.sharing_service import SharingService
                     sharing_service = SharingService()
                     result = sharing_service.process_sharing_token(token, user.id)
+                    _invalidate_accessible_project_ids(user.id)
                     print(f"DEBUG: Sharing token processed successfully: {result}")
                     flash(result['message'], 'success')
                     # Redirect to projects page with refresh parameter to ensure the new project shows up
@@ -1303,18 +1327,18 @@ def login():
 @app.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
-        email = request.form['email']
+        email = request.form['email'].lower()
         name = request.form['name']
         password = request.form['password']
         
-        if User.query.filter_by(email=email).first():
+        if _find_user_by_email(email):
             flash('Email already registered')
             return render_template('register.html')
         
         user = User(
             email=email,
             name=name,
-            password_hash=generate_password_hash(password)
+            password_hash=generate_password_hash(password, method=PASSWORD_HASH_METHOD)
         )
         db.session.add(user)
         db.session.commit()
@@ -1344,6 +1368,19 @@ def logout():
     logout_user()
     return redirect(url_for('index'))
 
+def _find_user_by_email(email):
+    """Look a user up by email case-insensitively in one query"""
+    if db.engine.dialect.name == 'mssql':
+        # Azure SQL's default collation already compares case-insensitively,
+        # so the plain unique index on email serves the lookup
+        return User.query.filter_by(email=email).first()
+    # Older rows may differ only in case; prefer the exact match so the
+    # same account is picked every time
+    return (User.query
+            .filter(db.func.lower(User.email) == email.lower())
+            .order_by((User.email == email).desc())
+            .first())
+
 # Helper function to generate secure redirect URIs
 def get_redirect_uri(endpoint):
     """Generate redirect URI with HTTPS for production"""
@@ -1384,29 +1421,31 @@ def authorize_google():
         sharing_token = request.args.get('state')
         print(f"DEBUG: Google OAuth - State parameter: {sharing_token}")
         
-        # Get user info from Google API
-        resp = google.get('https://www.googleapis.com/oauth2/v2/userinfo', token=token)
-        user_info = resp.json()
+        # authlib already verified the OpenID id_token and parsed its claims into
+        # token['userinfo']; only fall back to the userinfo API when it is missing
+        user_info = token.get('userinfo')
+        if not user_info:
+            resp = google.get(GOOGLE_USERINFO_URL, token=token)
+            user_info = resp.json()
         
         if user_info and user_info.get('email'):
             email = user_info.get('email')
             name = user_info.get('name', email.split('@')[0])
-            provider_id = user_info.get('id')
+            provider_id = user_info.get('id') or user_info.get('sub')  # same Google account id
             avatar_url = user_info.get('picture')
             
-            # Check if user exists
-            user = User.query.filter_by(email=email, provider='google').first()
+            # Check if user exists (single lookup, then branch on provider)
+            user = _find_user_by_email(email)
+            
+            if user and user.provider != 'google':
+                # Email exists with different provider
+                flash('An account with this email already exists. Please use the original login method.')
+                return redirect(url_for('login'))
             
             if not user:
-                # Check if email exists with different provider
-                existing_user = User.query.filter_by(email=email).first()
-                if existing_user:
-                    flash('An account with this email already exists. Please use the original login method.')
-                    return redirect(url_for('login'))
-                
                 # Create new user
                 user = User(
-                    email=email,
+                    email=email.lower(),
                     name=name,
                     provider='google',
                     provider_id=provider_id,
@@ -1427,6 +1466,7 @@ def authorize_google():
                     from services.sharing_service import SharingService
                     sharing_service = SharingService()
                     result = sharing_service.process_sharing_token(token, user.id)
+                    _invalidate_accessible_project_ids(user.id)
                     print(f"DEBUG: Google OAuth - Sharing token processed successfully: {result}")
                     flash(result['message'], 'success')
                     # Redirect to projects page with refresh parameter to ensure the new project shows up
@@ -1465,19 +1505,18 @@ def authorize_github():
             provider_id = str(user_info.get('id'))
             avatar_url = user_info.get('avatar_url')
             
-            # Check if user exists
-            user = User.query.filter_by(email=email, provider='github').first()
+            # Check if user exists (single lookup, then branch on provider)
+            user = _find_user_by_email(email)
+            
+            if user and user.provider != 'github':
+                # Email exists with different provider
+                flash('An account with this email already exists. Please use the original login method.')
+                return redirect(url_for('login'))
             
             if not user:
-                # Check if email exists with different provider
-                existing_user = User.query.filter_by(email=email).first()
-                if existing_user:
-                    flash('An account with this email already exists. Please use the original login method.')
-                    return redirect(url_for('login'))
-                
                 # Create new user
                 user = User(
-                    email=email,
+                    email=email.lower(),
                     name=name,
                     provider='github',
                     provider_id=provider_id,
@@ -1495,6 +1534,7 @@ def authorize_github():
                     from services.sharing_service import SharingService
                     sharing_service = SharingService()
                     result = sharing_service.process_sharing_token(token, user.id)
+                    _invalidate_accessible_project_ids(user.id)
                     flash(result['message'], 'success')
                     # Redirect to projects page with refresh parameter to ensure the new project shows up
                     return redirect(url_for('projects', refresh='true'))
@@ -1511,20 +1551,61 @@ def authorize_github():
         flash(f'GitHub authentication failed: {str(e)}')
         return redirect(url_for('login'))
 
+PROJECTS_PAGE_SIZE = 50
+
+# Short-lived, per-process cache of each user's accessible project ids
+PROJECT_IDS_CACHE_TTL = 30  # seconds
+_project_ids_cache = {}
+
+def _accessible_project_ids(user_id):
+    """Return PermissionManager.get_accessible_projects(user_id), memoized for a few seconds"""
+    from services.permission_manager import PermissionManager
+    
+    now = time.monotonic()
+    cached = _project_ids_cache.get(user_id)
+    if cached and cached[0] > now:
+        return cached[1]
+    
+    # Drop expired entries on each miss so the cache only holds recently active users
+    for expired_user_id in [uid for uid, (expires, _) in _project_ids_cache.items() if expires <= now]:
+        _project_ids_cache.pop(expired_user_id, None)
+    
+    project_ids = PermissionManager.get_accessible_projects(user_id)
+    _project_ids_cache[user_id] = (now + PROJECT_IDS_CACHE_TTL, project_ids)
+    return project_ids
+
+def _invalidate_accessible_project_ids(user_id):
+    """Forget a user's cached project ids after their access changes"""
+    _project_ids_cache.pop(user_id, None)
+
 @app.route('/projects')
 @login_required
 def projects():
     from services.permission_manager import PermissionManager
     
     try:
+        # Check if this is a refresh request (after accepting invitation)
+        refresh_requested = request.args.get('refresh') == 'true'
+        if refresh_requested:
+            _invalidate_accessible_project_ids(current_user.id)
+        
         # Get all accessible projects (owned + shared)
-        accessible_project_ids = PermissionManager.get_accessible_projects(current_user.id)
+        accessible_project_ids = _accessible_project_ids(current_user.id)
         
+        # Keyset pagination, newest first: ?cursor=<id> continues below that id
+        cursor = request.args.get('cursor', type=int)
         if accessible_project_ids:
-            projects = Project.query.filter(Project.id.in_(accessible_project_ids)).all()
+            query = Project.query.filter(Project.id.in_(accessible_project_ids))
+            if cursor:
+                query = query.filter(Project.id < cursor)
+            projects = query.order_by(Project.id.desc()).limit(PROJECTS_PAGE_SIZE + 1).all()
         else:
             projects = []
         
+        # The extra row only tells us whether another page exists
+        next_cursor = projects[PROJECTS_PAGE_SIZE - 1].id if len(projects) > PROJECTS_PAGE_SIZE else None
+        projects = projects[:PROJECTS_PAGE_SIZE]
+        
         # Add role information for each project
         projects_with_roles = []
         for project in projects:
@@ -1537,11 +1618,9 @@ def projects():
             }
             projects_with_roles.append(project_data)
         
-        # Check if this is a refresh request (after accepting invitation)
-        refresh_requested = request.args.get('refresh') == 'true'
         print(f"DEBUG: Projects page - refresh_requested: {refresh_requested}, project count: {len(projects_with_roles)}")
         
-        return render_template('projects.html', projects=projects_with_roles, refresh_requested=refresh_requested)
+        return render_template('projects.html', projects=projects_with_roles, refresh_requested=refresh_requested, next_cursor=next_cursor)
         
     except Exception as e:
         print(f"Error in projects route: {e}")
@@ -1555,7 +1634,8 @@ def projects():
             else:
                 print("Schema fix failed, trying migration approach...")
                 from migrations.azure_production_migration import run_production_migration
-                migration_success = run_production_migration()
+                # The schema is known to be broken here, so bypass the sentinel
+                migration_success = run_production_migration(force=True)
                 if migration_success:
                     print("Migration completed, retrying projects route...")
                     return redirect(url_for('projects'))
@@ -1761,6 +1841,7 @@ def new_project():
         )
         db.session.add(project)
         db.session.commit()
+        _invalidate_accessible_project_ids(current_user.id)
         return redirect(url_for('view_project', id=project.id))
     
     return render_template('new_project.html')
@@ -1794,40 +1875,43 @@ def view_project(id):
     }
     
     # Get tasks with hierarchy, ordered to show child tasks under their parents
-    # First get all parent tasks (parent_id is null), then recursively get all descendants
-    parent_tasks = Task.query.filter_by(project_id=id, parent_id=None).order_by(
+    # Load every task of the project in one query (owner joined, collections batched)
+    # and group them by parent_id instead of issuing one query per parent
+    project_tasks = Task.query.options(
+        db.joinedload(Task.owner),
+        db.selectinload(Task.labels),
+        db.selectinload(Task.dependencies).joinedload(TaskDependency.depends_on),
+        db.selectinload(Task.dependents).joinedload(TaskDependency.task)
+    ).filter_by(project_id=id).order_by(
         Task.sort_order, 
         Task.created_at
     ).all()
     
+    children_by_parent = {}
+    for task in project_tasks:
+        children_by_parent.setdefault(task.parent_id, []).append(task)
+    
     def build_hierarchy_recursive(parent_task, all_tasks):
         """Recursively build task hierarchy with unlimited nesting levels"""
         all_tasks.append(parent_task)
         
-        # Get direct children of this parent
-        child_tasks = Task.query.filter_by(project_id=id, parent_id=parent_task.id).order_by(
-            Task.sort_order, 
-            Task.created_at
-        ).all()
-        
-        # Recursively add children and their descendants
-        for child in child_tasks:
+        # Recursively add direct children and their descendants
+        for child in children_by_parent.get(parent_task.id, ()):
             build_hierarchy_recursive(child, all_tasks)
     
     # Build ordered task list with children under their parents (recursive)
     tasks = []
-    for parent in parent_tasks:
+    for parent in children_by_parent.get(None, ()):
         build_hierarchy_recursive(parent, tasks)
     
     # Convert tasks to dictionaries for JSON serialization
-    tasks_data = []
-    for task in tasks:
-        task_dict = {
+    tasks_data = [
+        {
             'id': task.id,
             'title': task.title,
             'description': task.description,
-            'start_date': task.start_date.strftime('%Y-%m-%d') if task.start_date else None,
-            'end_date': task.end_date.strftime('%Y-%m-%d') if task.end_date else None,
+            'start_date': task.start_date.isoformat() if task.start_date else None,
+            'end_date': task.end_date.isoformat() if task.end_date else None,
             'status': task.status,
             'priority': task.priority,
             'size': task.size,
@@ -1843,19 +1927,22 @@ def view_project(id):
             'dependencies': [{'id': dep.id, 'depends_on_id': dep.depends_on_id, 'depends_on_title': dep.depends_on.title, 'dependency_type': dep.dependency_type} for dep in task.dependencies],
             'dependents': [{'id': dep.id, 'task_id': dep.task_id, 'task_title': dep.task.title, 'dependency_type': dep.dependency_type} for dep in task.dependents],
             # Add workflow fields
-            'workflow_status': task.workflow_status if hasattr(task, 'workflow_status') else 'backlog',
-            'started_at': task.started_at.isoformat() if hasattr(task, 'started_at') and task.started_at else None,
-            'committed_at': task.committed_at.isoformat() if hasattr(task, 'committed_at') and task.committed_at else None,
-            'completed_at': task.completed_at.isoformat() if hasattr(task, 'completed_at') and task.completed_at else None,
+            'workflow_status': task.workflow_status,
+            'started_at': task.started_at.isoformat() if task.started_at else None,
+            'committed_at': task.committed_at.isoformat() if task.committed_at else None,
+            'completed_at': task.completed_at.isoformat() if task.completed_at else None,
             # Add workflow button information
-            'workflow_button_text': task.get_workflow_button_text() if hasattr(task, 'get_workflow_button_text') else 'Start',
-            'workflow_button_class': task.get_workflow_button_class() if hasattr(task, 'get_workflow_button_class') else 'bg-blue-600 hover:bg-blue-700',
+            'workflow_button_text': task.get_workflow_button_text(),
+            'workflow_button_class': task.get_workflow_button_class(),
             # Add reset button information
-            'can_reset_workflow': task.can_reset_workflow() if hasattr(task, 'can_reset_workflow') else False,
-            'reset_button_text': task.get_reset_button_text() if hasattr(task, 'get_reset_button_text') else 'Reset',
-            'reset_button_class': task.get_reset_button_class() if hasattr(task, 'get_reset_button_class') else 'bg-red-600 hover:bg-red-700'
+            'can_reset_workflow': task.can_reset_workflow(),
+            'reset_button_text': task.get_reset_button_text(),
+            'reset_button_class': task.get_reset_button_class()
         }
-        tasks_data.append(task_dict)
+        for task in tasks
+    ]
+    # Index by id so the template looks each task up in O(1)
+    tasks_data_by_id = {task_data['id']: task_data for task_data in tasks_data}
     
     # Get labels for the project
     labels = Label.query.filter_by(project_id=id).all()
@@ -1898,6 +1985,7 @@ def view_project(id):
                          project=project, 
                          tasks=tasks, 
                          tasks_data=tasks_data, 
+                         tasks_data_by_id=tasks_data_by_id,
                          labels=labels,
                          user_role=user_role,
                          user_permissions=user_permissions,
@@ -1983,9 +2071,21 @@ def delete_project(id):
     
     db.session.delete(project)
     db.session.commit()
+    _invalidate_accessible_project_ids(current_user.id)
     flash(f'Project "{project_name}" has been deleted')
     return redirect(url_for('projects'))
 
+# Task form helpers
+def _opt_date(form, key):
+    """Parse an optional YYYY-MM-DD form field, returning None when blank"""
+    value = form.get(key)
+    return date.fromisoformat(value) if value else None
+
+def _opt_int(form, key):
+    """Parse an optional integer form field, returning None when blank"""
+    value = form.get(key)
+    return int(value) if value else None
+
 # Task routes
 @app.route('/projects/<int:project_id>/tasks/new', methods=['GET', 'POST'])
 @login_required
@@ -2023,12 +2123,12 @@ def new_task(project_id):
             description=request.form['description'],
             project_id=project_id,
             owner_id=current_user.id,
-            start_date=datetime.strptime(request.form['start_date'], '%Y-%m-%d').date() if request.form['start_date'] else None,
-            end_date=datetime.strptime(request.form['end_date'], '%Y-%m-%d').date() if request.form['end_date'] else None,
+            start_date=_opt_date(request.form, 'start_date'),
+            end_date=_opt_date(request.form, 'end_date'),
             status=request.form['status'],
             priority=request.form['priority'],
             size=request.form['size'],
-            parent_id=int(request.form['parent_id']) if request.form['parent_id'] else None,
+            parent_id=_opt_int(request.form, 'parent_id'),
             sort_order=max_sort_order + 1,
             risk_level=request.form.get('risk_level', 'low'),
             risk_description=request.form.get('risk_description', ''),
@@ -2141,12 +2241,12 @@ def edit_task(project_id, task_id):
     if request.method == 'POST':
         task.title = request.form['title']
         task.description = request.form['description']
-        task.start_date = datetime.strptime(request.form['start_date'], '%Y-%m-%d').date() if request.form['start_date'] else None
-        task.end_date = datetime.strptime(request.form['end_date'], '%Y-%m-%d').date() if request.form['end_date'] else None
+        task.start_date = _opt_date(request.form, 'start_date')
+        task.end_date = _opt_date(request.form, 'end_date')
         task.status = request.form['status']
         task.priority = request.form['priority']
         task.size = request.form['size']
-        task.parent_id = int(request.form['parent_id']) if request.form['parent_id'] else None
+        task.parent_id = _opt_int(request.form, 'parent_id')
         task.risk_level = request.form.get('risk_level', 'low')
         task.risk_description = request.form.get('risk_description', '')
         task.mitigation_plan = request.form.get('mitigation_plan', '')
@@ -2584,46 +2684,75 @@ def add_discussion_comment(project_id, task_id):
     })
 
 # CSV Import/Export
+# CSV header -> Task column, in export order
+CSV_TASK_COLUMNS = {
+    'Title': 'title',
+    'Description': 'description',
+    'Start Date': 'start_date',
+    'End Date': 'end_date',
+    'Status': 'status',
+    'Priority': 'priority',
+    'Size': 'size',
+    'Parent ID': 'parent_id'
+}
+
+# Values used when an optional column is missing or blank in an imported CSV
+CSV_TASK_DEFAULTS = {
+    'description': '',
+    'status': 'backlog',
+    'priority': 'medium',
+    'size': 'medium'
+}
+
+def _owned_project(id):
+    """Fetch a project owned by the current user in one query, 404 otherwise"""
+    return Project.query.filter_by(id=id, owner_id=current_user.id).first_or_404()
+
 @app.route('/projects/<int:id>/export')
 @login_required
 def export_project(id):
-    project = Project.query.get_or_404(id)
-    if project.owner_id != current_user.id:
-        flash('Access denied')
-        return redirect(url_for('projects'))
-    
-    tasks = Task.query.filter_by(project_id=id).all()
+    project = _owned_project(id)
     
-    # Create CSV data
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['Title', 'Description', 'Start Date', 'End Date', 'Status', 'Priority', 'Size', 'Parent ID'])
-    
-    for task in tasks:
-        writer.writerow([
-            task.title,
-            task.description or '',
-            task.start_date.strftime('%Y-%m-%d') if task.start_date else '',
-            task.end_date.strftime('%Y-%m-%d') if task.end_date else '',
-            task.status,
-            task.priority,
-            task.size,
-            task.parent_id or ''
-        ])
+    def generate():
+        # Reuse one small buffer per row so memory stays flat for large projects
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        
+        def flush():
+            line = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return line
+        
+        writer.writerow(list(CSV_TASK_COLUMNS))
+        yield flush()
+        
+        tasks = Task.query.options(db.load_only(
+            Task.title, Task.description, Task.start_date, Task.end_date,
+            Task.status, Task.priority, Task.size, Task.parent_id
+        )).filter_by(project_id=id).yield_per(1000)
+        
+        for task in tasks:
+            writer.writerow([
+                task.title,
+                task.description or '',
+                task.start_date.strftime('%Y-%m-%d') if task.start_date else '',
+                task.end_date.strftime('%Y-%m-%d') if task.end_date else '',
+                task.status,
+                task.priority,
+                task.size,
+                task.parent_id or ''
+            ])
+            yield flush()
     
-    output.seek(0)
-    return output.getvalue(), 200, {
-        'Content-Type': 'text/csv',
+    return Response(stream_with_context(generate()), mimetype='text/csv', headers={
         'Content-Disposition': f'attachment; filename={project.name}_tasks.csv'
-    }
+    })
 
 @app.route('/projects/<int:id>/import', methods=['GET', 'POST'])
 @login_required
 def import_project(id):
-    project = Project.query.get_or_404(id)
-    if project.owner_id != current_user.id:
-        flash('Access denied')
-        return redirect(url_for('projects'))
+    project = _owned_project(id)
     
     if request.method == 'POST':
         if 'file' not in request.files:
@@ -2638,24 +2767,39 @@ def import_project(id):
         if file and file.filename.endswith('.csv'):
             try:
                 df = pd.read_csv(file)
-                for _, row in df.iterrows():
-                    task = Task(
-                        title=row['Title'],
-                        description=row.get('Description', ''),
-                        project_id=id,
-                        owner_id=current_user.id,
-                        start_date=pd.to_datetime(row.get('Start Date')).date() if pd.notna(row.get('Start Date')) else None,
-                        end_date=pd.to_datetime(row.get('End Date')).date() if pd.notna(row.get('End Date')) else None,
-                        status=row.get('Status', 'backlog'),
-                        priority=row.get('Priority', 'medium'),
-                        size=row.get('Size', 'medium'),
-                        parent_id=int(row['Parent ID']) if pd.notna(row.get('Parent ID')) else None,
-                        task_create_user=current_user.id  # Track who created the task
-                    )
-                    db.session.add(task)
+                if 'Title' not in df:
+                    flash('Error importing file: the CSV must have a "Title" column')
+                    return render_template('import_project.html', project=project)
+                
+                # Parse and cast whole columns at once instead of row by row;
+                # format='mixed' parses each cell on its own, so one column
+                # can mix date formats
+                unparsed_dates = 0
+                for column in ('Start Date', 'End Date'):
+                    if column in df:
+                        parsed = pd.to_datetime(df[column], format='mixed', errors='coerce')
+                        unparsed_dates += int((parsed.isna() & df[column].notna()).sum())
+                        df[column] = parsed.dt.date
+                if 'Parent ID' in df:
+                    df['Parent ID'] = df['Parent ID'].astype('Int64')
+                
+                tasks_df = df[[column for column in CSV_TASK_COLUMNS if column in df]].rename(columns=CSV_TASK_COLUMNS)
+                tasks_df = tasks_df.assign(**{
+                    field: tasks_df[field].fillna(default) if field in tasks_df else default
+                    for field, default in CSV_TASK_DEFAULTS.items()
+                })
+                tasks_df = tasks_df.astype(object).where(tasks_df.notna(), None)
+                tasks_df['project_id'] = id
+                tasks_df['owner_id'] = current_user.id
+                tasks_df['task_create_user'] = current_user.id  # Track who created the task
+                
+                db.session.bulk_insert_mappings(Task, tasks_df.to_dict('records'))
                 db.session.commit()
                 flash('Tasks imported successfully')
+                if unparsed_dates:
+                    flash(f'{unparsed_dates} date value(s) could not be parsed and were left empty')
             except Exception as e:
+                db.session.rollback()
                 flash(f'Error importing file: {str(e)}')
         else:
             flash('Please select a CSV file')
@@ -2865,7 +3009,7 @@ def generate_project_brief():
         if not project_name or not user_input:
             return jsonify({'error': 'Project name and user input are required'}), 400
         
-        ai_assistant = AIAssistant()
+        ai_assistant = get_ai_assistant()
         brief = ai_assistant.generate_project_brief(project_name, user_input)
         
         return jsonify({'brief': brief})
@@ -2885,7 +3029,7 @@ def generate_starter_plan():
         if not project_name:
             return jsonify({'error': 'Project name is required'}), 400
         
-        ai_assistant = AIAssistant()
+        ai_assistant = get_ai_assistant()
         tasks = ai_assistant.generate_starter_project_plan(project_name, project_brief)
         
         return jsonify({'tasks': tasks})
@@ -2926,10 +3070,13 @@ def generate_project_summary():
                 'status': task.status
             })
         
-        ai_assistant = AIAssistant()
-        summary = ai_assistant.generate_project_summary(project.name, tasks_data, project_brief)
+        # The model stream is opened here, inside the try, so a failure to
+        # start still returns the JSON error; only the text streams afterwards
+        ai_assistant = get_ai_assistant()
+        summary = ai_assistant.stream_project_summary(project.name, tasks_data, project_brief)
         
-        return jsonify({'summary': summary})
+        # Stream the text as the model writes it so the modal fills in from the first token
+        return Response(stream_with_context(summary), mimetype='text/plain')
         
     except Exception as e:
         return jsonify({'error': f'Failed to generate summary: {str(e)}'}), 500
@@ -2956,7 +3103,7 @@ def generate_starter_tasks(project_id):
             'goals': project.goals or ''
         }
         
-        ai_assistant = AIAssistant()
+        ai_assistant = get_ai_assistant()
         tasks = ai_assistant.generate_starter_project_plan(project.name, project_brief)
         
         # Create tasks in database
@@ -3686,6 +3833,7 @@ def process_sharing_invitation(token):
     try:
         sharing_service = SharingService()
         result = sharing_service.process_sharing_token(token, current_user.id)
+        _invalidate_accessible_project_ids(current_user.id)
         
         flash(result['message'], 'success')
         
@@ -4008,6 +4156,7 @@ def update_collaborator_role(id, user_id):
         )
         
         db.session.commit()
+        _invalidate_accessible_project_ids(collaborator.user_id)
         
         return jsonify({
             'success': True,
@@ -4077,6 +4226,7 @@ def remove_collaborator(id, user_id):
         # Remove the collaborator
         db.session.delete(collaborator)
         db.session.commit()
+        _invalidate_accessible_project_ids(user_id)
         
         return jsonify({
             'success': True,
@@ -4111,6 +4261,7 @@ def accept_sharing_invitation_api(token):
         
         sharing_service = SharingService()
         result = sharing_service.process_sharing_token(token, current_user.id)
+        _invalidate_accessible_project_ids(current_user.id)
         
         return jsonify({
             'success': True,
@@ -12,6 +12,21 @@ import sys
 # Add the parent directory to the path to import app modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Basic sharing indexes used when azure_database_config is unavailable
+SHARING_INDEXES = (
+    # Project collaborator lookups
+    "CREATE INDEX IF NOT EXISTS idx_project_collaborators_project_user ON project_collaborators(project_id, user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_project_collaborators_user_status ON project_collaborators(user_id, status)",
+    # Sharing token lookups
+    "CREATE INDEX IF NOT EXISTS idx_sharing_tokens_token ON sharing_tokens(token)",
+    "CREATE INDEX IF NOT EXISTS idx_sharing_tokens_project_active ON sharing_tokens(project_id, is_active)",
+    # Activity log queries
+    "CREATE INDEX IF NOT EXISTS idx_sharing_activity_log_project_created ON sharing_activity_log(project_id, created_at)",
+    # Active session lookups
+    "CREATE INDEX IF NOT EXISTS idx_active_sessions_user_project ON active_sessions(user_id, project_id)",
+    "CREATE INDEX IF NOT EXISTS idx_active_sessions_last_activity ON active_sessions(last_activity)",
+)
+
 def run_migration():
     """Run the migration to add sharing models"""
     
@@ -84,49 +99,15 @@ def add_indexes(db):
         # Fallback to basic index creation if azure_database_config is not available
         print("Azure database config not available, using basic index creation")
         
-        from sqlalchemy import text
-        
-        # Index for project collaborator lookups
+        # Send every index in one batch instead of one statement per round trip
+        script = ";\n".join(SHARING_INDEXES) + ";"
         with db.engine.connect() as conn:
-            conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS idx_project_collaborators_project_user 
-                ON project_collaborators(project_id, user_id)
-            """))
-            
-            conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS idx_project_collaborators_user_status 
-                ON project_collaborators(user_id, status)
-            """))
-            
-            # Index for sharing token lookups
-            conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS idx_sharing_tokens_token 
-                ON sharing_tokens(token)
-            """))
-            
-            conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS idx_sharing_tokens_project_active 
-                ON sharing_tokens(project_id, is_active)
-            """))
-            
-            # Index for activity log queries
-            conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS idx_sharing_activity_log_project_created 
-                ON sharing_activity_log(project_id, created_at)
-            """))
-            
-            # Index for active session lookups
-            conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS idx_active_sessions_user_project 
-                ON active_sessions(user_id, project_id)
-            """))
-            
-            conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS idx_active_sessions_last_activity 
-                ON active_sessions(last_activity)
-            """))
-            
-            conn.commit()
+            if db.engine.dialect.name == 'sqlite':
+                # sqlite3's executescript runs the whole batch in a single call
+                conn.connection.dbapi_connection.executescript(script)
+            else:
+                conn.exec_driver_sql(script)
+                conn.commit()
         
         print("✓ Basic database indexes created successfully")
         
@@ -26,7 +26,7 @@ def run_migration():
             from sqlalchemy import inspect, text
             
             inspector = inspect(db.engine)
-            columns = [col['name'] for col in inspector.get_columns('task')]
+            columns = frozenset(col['name'] for col in inspector.get_columns('task'))
             
             new_columns = ['assigned_to', 'assigned_by', 'assigned_at']
             existing_columns = [col for col in new_columns if col in columns]
@@ -71,7 +71,7 @@ def run_migration():
             
             # Verify columns were added
             inspector = inspect(db.engine)
-            updated_columns = [col['name'] for col in inspector.get_columns('task')]
+            updated_columns = frozenset(col['name'] for col in inspector.get_columns('task'))
             
             added_columns = [col for col in new_columns if col in updated_columns]
             
@@ -8,19 +8,31 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app import app, db
 from sqlalchemy import text, inspect
 from datetime import datetime
 
+# Flagging column -> column definition, in creation order
+FLAGGING_COLUMNS = {
+    'is_flagged': 'BIT DEFAULT 0',
+    'flag_comment': 'TEXT',
+    'flagged_by': 'INTEGER REFERENCES [user](id)',
+    'flagged_at': 'DATETIME2',
+    'flag_resolved': 'BIT DEFAULT 0',
+    'flag_resolved_at': 'DATETIME2',
+    'flag_resolved_by': 'INTEGER REFERENCES [user](id)',
+}
+
 def add_task_flagging_fields():
     """Add flagging fields to task table"""
+    from app import db
+    
     try:
         with db.engine.connect() as conn:
             # Check if columns already exist
             inspector = inspect(db.engine)
-            columns = [col['name'] for col in inspector.get_columns('task')]
+            columns = frozenset(col['name'] for col in inspector.get_columns('task'))
             
-            new_columns = ['is_flagged', 'flag_comment', 'flagged_by', 'flagged_at', 'flag_resolved', 'flag_resolved_at', 'flag_resolved_by']
+            new_columns = list(FLAGGING_COLUMNS)
             existing_columns = [col for col in new_columns if col in columns]
             
             if len(existing_columns) == len(new_columns):
@@ -29,67 +41,28 @@ def add_task_flagging_fields():
             
             print(f"Adding {len(new_columns) - len(existing_columns)} flagging columns...")
             
-            # Add is_flagged column
-            if 'is_flagged' not in columns:
-                conn.execute(text("""
-                    ALTER TABLE task 
-                    ADD is_flagged BIT DEFAULT 0
-                """))
-                print("✓ Added 'is_flagged' column")
-            
-            # Add flag_comment column
-            if 'flag_comment' not in columns:
-                conn.execute(text("""
-                    ALTER TABLE task 
-                    ADD flag_comment TEXT
-                """))
-                print("✓ Added 'flag_comment' column")
-            
-            # Add flagged_by column
-            if 'flagged_by' not in columns:
-                conn.execute(text("""
-                    ALTER TABLE task 
-                    ADD flagged_by INTEGER REFERENCES [user](id)
-                """))
-                print("✓ Added 'flagged_by' column")
-            
-            # Add flagged_at column
-            if 'flagged_at' not in columns:
-                conn.execute(text("""
-                    ALTER TABLE task 
-                    ADD flagged_at DATETIME2
-                """))
-                print("✓ Added 'flagged_at' column")
-            
-            # Add flag_resolved column
-            if 'flag_resolved' not in columns:
-                conn.execute(text("""
-                    ALTER TABLE task 
-                    ADD flag_resolved BIT DEFAULT 0
-                """))
-                print("✓ Added 'flag_resolved' column")
-            
-            # Add flag_resolved_at column
-            if 'flag_resolved_at' not in columns:
-                conn.execute(text("""
-                    ALTER TABLE task 
-                    ADD flag_resolved_at DATETIME2
-                """))
-                print("✓ Added 'flag_resolved_at' column")
-            
-            # Add flag_resolved_by column
-            if 'flag_resolved_by' not in columns:
-                conn.execute(text("""
-                    ALTER TABLE task 
-                    ADD flag_resolved_by INTEGER REFERENCES [user](id)
-                """))
-                print("✓ Added 'flag_resolved_by' column")
+            missing_columns = [col for col in new_columns if col not in columns]
+            
+            if db.engine.dialect.name == 'mssql':
+                # SQL Server adds every column in one ALTER: one schema
+                # modification lock and metadata change instead of one per column
+                conn.execute(text(
+                    "ALTER TABLE task ADD "
+                    + ", ".join(f"{col} {FLAGGING_COLUMNS[col]}" for col in missing_columns)
+                ))
+                for col in missing_columns:
+                    print(f"✓ Added '{col}' column")
+            else:
+                # SQLite only accepts one column per ALTER TABLE
+                for col in missing_columns:
+                    conn.execute(text(f"ALTER TABLE task ADD {col} {FLAGGING_COLUMNS[col]}"))
+                    print(f"✓ Added '{col}' column")
             
             conn.commit()
             
             # Verify columns were added
             inspector = inspect(db.engine)
-            updated_columns = [col['name'] for col in inspector.get_columns('task')]
+            updated_columns = frozenset(col['name'] for col in inspector.get_columns('task'))
             
             added_columns = [col for col in new_columns if col in updated_columns]
             
@@ -106,6 +79,8 @@ def add_task_flagging_fields():
 
 def add_flagging_indexes():
     """Add indexes for flagging fields for better performance"""
+    from app import db
+    
     try:
         with db.engine.connect() as conn:
             # Add index for is_flagged for quick filtering
@@ -158,6 +133,8 @@ def run_migration():
 
 def rollback_migration():
     """Rollback the flagging migration"""
+    from app import db
+    
     print("Rolling back task flagging migration...")
     try:
         with db.engine.connect() as conn:
@@ -184,6 +161,8 @@ def rollback_migration():
         return False
 
 if __name__ == "__main__":
+    from app import app
+    
     with app.app_context():
         if len(sys.argv) > 1 and sys.argv[1] == "rollback":
             rollback_migration()
@@ -33,7 +33,7 @@ def add_task_hierarchy_field():
             
             # Check if the field already exists
             inspector = inspect(db.engine)
-            columns = [col['name'] for col in inspector.get_columns('task')]
+            columns = frozenset(col['name'] for col in inspector.get_columns('task'))
             
             if 'is_expanded' in columns:
                 logger.info("is_expanded field already exists in Task table")
@@ -60,7 +60,7 @@ def add_task_hierarchy_field():
             
             # Verify the field was added
             inspector = inspect(db.engine)
-            updated_columns = [col['name'] for col in inspector.get_columns('task')]
+            updated_columns = frozenset(col['name'] for col in inspector.get_columns('task'))
             
             if 'is_expanded' in updated_columns:
                 logger.info("✓ Successfully added is_expanded field to Task table")
@@ -88,7 +88,7 @@ def rollback_task_hierarchy_field():
             
             # Check if the field exists
             inspector = inspect(db.engine)
-            columns = [col['name'] for col in inspector.get_columns('task')]
+            columns = frozenset(col['name'] for col in inspector.get_columns('task'))
             
             if 'is_expanded' not in columns:
                 logger.info("is_expanded field does not exist, nothing to rollback")
@@ -8,119 +8,108 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app import app, db
 from sqlalchemy import text, inspect
 from datetime import datetime
 
-def add_workflow_status_column():
+def add_workflow_status_column(conn):
     """Add workflow_status column to task table"""
     try:
-        with db.engine.connect() as conn:
-            # Check if column already exists
-            inspector = inspect(db.engine)
-            columns = [col['name'] for col in inspector.get_columns('task')]
-            
-            if 'workflow_status' in columns:
-                print("✓ workflow_status column already exists")
-                return True
-            
-            # Add workflow_status column
-            conn.execute(text("""
-                ALTER TABLE task 
-                ADD workflow_status VARCHAR(20) DEFAULT 'backlog'
-            """))
-            
-            # Update existing tasks to have proper workflow_status based on their current status
-            conn.execute(text("""
-                UPDATE task 
-                SET workflow_status = CASE 
-                    WHEN status = 'backlog' THEN 'backlog'
-                    WHEN status = 'committed' THEN 'committed' 
-                    WHEN status = 'in_progress' THEN 'in_progress'
-                    WHEN status = 'blocked' THEN 'in_progress'  -- blocked tasks are still in progress
-                    WHEN status = 'completed' THEN 'completed'
-                    ELSE 'backlog'
-                END
-            """))
-            
-            conn.commit()
-            print("✓ Added workflow_status column and migrated existing data")
+        # Check if column already exists
+        inspector = inspect(conn)
+        columns = frozenset(col['name'] for col in inspector.get_columns('task'))
+        
+        if 'workflow_status' in columns:
+            print("✓ workflow_status column already exists")
             return True
-            
+        
+        # Add workflow_status column
+        conn.execute(text("""
+            ALTER TABLE task 
+            ADD workflow_status VARCHAR(20) DEFAULT 'backlog'
+        """))
+        
+        # Update existing tasks to have proper workflow_status based on their current status
+        conn.execute(text("""
+            UPDATE task 
+            SET workflow_status = CASE 
+                WHEN status = 'backlog' THEN 'backlog'
+                WHEN status = 'committed' THEN 'committed' 
+                WHEN status = 'in_progress' THEN 'in_progress'
+                WHEN status = 'blocked' THEN 'in_progress'  -- blocked tasks are still in progress
+                WHEN status = 'completed' THEN 'completed'
+                ELSE 'backlog'
+            END
+        """))
+        
+        print("✓ Added workflow_status column and migrated existing data")
+        return True
+        
     except Exception as e:
         print(f"✗ Error adding workflow_status column: {e}")
         return False
 
-def add_workflow_timestamps():
+def add_workflow_timestamps(conn):
     """Add workflow timestamp columns"""
     try:
-        with db.engine.connect() as conn:
-            inspector = inspect(db.engine)
-            columns = [col['name'] for col in inspector.get_columns('task')]
-            
-            # Add started_at column
-            if 'started_at' not in columns:
-                conn.execute(text("""
-                    ALTER TABLE task 
-                    ADD started_at DATETIME2
-                """))
-                print("✓ Added started_at column")
-            
-            # Add committed_at column  
-            if 'committed_at' not in columns:
-                conn.execute(text("""
-                    ALTER TABLE task 
-                    ADD committed_at DATETIME2
-                """))
-                print("✓ Added committed_at column")
-            
-            # Add completed_at column
-            if 'completed_at' not in columns:
-                conn.execute(text("""
-                    ALTER TABLE task 
-                    ADD completed_at DATETIME2
-                """))
-                print("✓ Added completed_at column")
-            
-            conn.commit()
-            return True
-            
-    except Exception as e:
-        print(f"✗ Error adding workflow timestamp columns: {e}")
-        return False
-
-def add_workflow_indexes():
-    """Add indexes for workflow queries"""
-    try:
-        with db.engine.connect() as conn:
-            # Add index on workflow_status for filtering
+        inspector = inspect(conn)
+        columns = frozenset(col['name'] for col in inspector.get_columns('task'))
+        
+        # Add started_at column
+        if 'started_at' not in columns:
             conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS idx_task_workflow_status 
-                ON task(workflow_status)
+                ALTER TABLE task 
+                ADD started_at DATETIME2
             """))
-            
-            # Add index on started_at for sorting
+            print("✓ Added started_at column")
+        
+        # Add committed_at column  
+        if 'committed_at' not in columns:
             conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS idx_task_started_at 
-                ON task(started_at)
+                ALTER TABLE task 
+                ADD committed_at DATETIME2
             """))
-            
-            # Add index on committed_at for sorting
+            print("✓ Added committed_at column")
+        
+        # Add completed_at column
+        if 'completed_at' not in columns:
             conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS idx_task_committed_at 
-                ON task(committed_at)
-            """))
-            
-            # Add index on completed_at for sorting
-            conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS idx_task_completed_at 
-                ON task(completed_at)
+                ALTER TABLE task 
+                ADD completed_at DATETIME2
             """))
-            
-            conn.commit()
-            print("✓ Added workflow indexes")
-            return True
-            
+            print("✓ Added completed_at column")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error adding workflow timestamp columns: {e}")
+        return False
+
+# Workflow indexes as (index name, task column)
+_WORKFLOW_INDEXES = (
+    ('idx_task_workflow_status', 'workflow_status'),  # filtering
+    ('idx_task_started_at', 'started_at'),            # sorting
+    ('idx_task_committed_at', 'committed_at'),        # sorting
+    ('idx_task_completed_at', 'completed_at'),        # sorting
+)
+
+def _create_index_sql(conn, index_name, column_name):
+    """CREATE INDEX that is a no-op when the index exists; T-SQL has no IF NOT EXISTS"""
+    if conn.dialect.name == 'mssql':
+        return text(f"""
+            IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = '{index_name}' AND object_id = OBJECT_ID('task'))
+            CREATE INDEX {index_name} ON task({column_name})
+        """)
+    return text(f"CREATE INDEX IF NOT EXISTS {index_name} ON task({column_name})")
+
+def add_workflow_indexes(conn):
+    """Add indexes for workflow queries"""
+    try:
+        for index_name, column_name in _WORKFLOW_INDEXES:
+            conn.execute(_create_index_sql(conn, index_name, column_name))
+        
+        print("✓ Added workflow indexes")
+        return True
+        
     except Exception as e:
         print(f"✗ Error adding workflow indexes: {e}")
         return False
@@ -130,19 +119,21 @@ def run_migration():
     print("Starting task workflow migration...")
     print("=" * 50)
     
+    # Import the app lazily so importing this module doesn't build the app
+    from app import app, db
+    
     with app.app_context():
         try:
-            # Add workflow_status column
-            if not add_workflow_status_column():
-                return False
-            
-            # Add workflow timestamp columns
-            if not add_workflow_timestamps():
-                return False
-            
-            # Add workflow indexes
-            if not add_workflow_indexes():
-                return False
+            # Share one connection and commit after each step. A failed step
+            # cannot be relied on to roll back (SQLite autocommits DDL), but
+            # every step skips work that is already done, so a rerun resumes
+            with db.engine.connect() as conn:
+                # Add workflow_status column, timestamp columns, then indexes
+                for step in (add_workflow_status_column, add_workflow_timestamps, add_workflow_indexes):
+                    if not step(conn):
+                        conn.rollback()
+                        return False
+                    conn.commit()
             
             print("\n" + "=" * 50)
             print("✓ Task workflow migration completed successfully!")
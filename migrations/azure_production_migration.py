@@ -6,9 +6,13 @@ Handles database schema updates, indexing, and optimization for Azure SQL Databa
 import os
 import sys
 import logging
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 
+from sqlalchemy import bindparam, inspect, text
+
 # Add the parent directory to the path to import app modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -19,18 +23,508 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Metadata and maintenance statements are constant, so build them once and let
+# SQLAlchemy's compiled-statement cache hit on every execution
+_SQL_SELECT_ONE = text("SELECT 1 as test")
+
+_SQL_VERSION = text("SELECT @@VERSION as version")
+
+# Bump when the migration steps change so existing databases re-run them;
+# otherwise a boot against an already-migrated database is one keyed lookup
+_MIGRATION_VERSION = 'azure_production_migration:1'
+
+_SQL_MIGRATION_APPLIED = text("SELECT 1 FROM schema_migrations WHERE version = :version")
+
+_SQL_CREATE_SCHEMA_MIGRATIONS = text("""
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version VARCHAR(100) PRIMARY KEY,
+        applied_at TIMESTAMP NOT NULL
+    )
+""")
+
+_SQL_MSSQL_CREATE_SCHEMA_MIGRATIONS = text("""
+    IF OBJECT_ID('schema_migrations', 'U') IS NULL
+    CREATE TABLE schema_migrations (
+        version NVARCHAR(100) PRIMARY KEY,
+        applied_at DATETIME2 NOT NULL
+    )
+""")
+
+_SQL_RECORD_MIGRATION = text(
+    "INSERT INTO schema_migrations (version, applied_at) VALUES (:version, :applied_at)"
+)
+
+_SQL_PERMS = text("""
+    SELECT 
+        HAS_PERMS_BY_NAME(NULL, NULL, 'CREATE TABLE') as can_create_table,
+        HAS_PERMS_BY_NAME(NULL, NULL, 'CREATE INDEX') as can_create_index,
+        HAS_PERMS_BY_NAME(NULL, NULL, 'CREATE PROCEDURE') as can_create_procedure
+""")
+
+_SQL_PG_VERSION = text("SELECT version()")
+
+_SQL_PG_EXTENSIONS = text("""
+    SELECT name FROM pg_available_extensions 
+    WHERE name IN ('pg_stat_statements', 'pg_buffercache')
+""")
+
+_TABLES_TO_OPTIMIZE = (
+    'project_collaborators', 'sharing_tokens', 'sharing_activity_log', 
+    'active_sessions', 'task', 'project', 'user', 'label', 'task_labels',
+    'task_dependency', 'invitation_notifications'
+)
+
+# Only statistics with more than 10% of rows modified since the last update
+# are refreshed, mirroring sp_updatestats without recompiling everything
+_SQL_STALE_STATISTICS = text(f"""
+    SELECT OBJECT_NAME(s.object_id) as table_name, s.name as stats_name
+    FROM sys.stats s
+    CROSS APPLY sys.dm_db_stats_properties(s.object_id, s.stats_id) p
+    WHERE OBJECT_NAME(s.object_id) IN ({', '.join(f"'{table}'" for table in _TABLES_TO_OPTIMIZE)})
+    AND p.modification_counter > p.rows * 0.1
+""")
+
+# Statistics updates are independent per table, so run a few at once while
+# staying within the database's DTU/vCore budget
+_STATISTICS_MAX_WORKERS = 4
+
+# Task status -> workflow_status mapping used to backfill existing tasks
+_WORKFLOW_STATUS_BACKFILL = (
+    ('backlog', 'backlog'),
+    ('committed', 'committed'),
+    ('in_progress', 'in_progress'),
+    ('blocked', 'in_progress'),  # blocked tasks are still in progress
+    ('completed', 'completed'),
+)
+
+_WORKFLOW_STATUS_PARAMS = {'w_default': 'backlog'}
+_WORKFLOW_STATUS_PARAMS.update(
+    (f's{i}', status) for i, (status, _) in enumerate(_WORKFLOW_STATUS_BACKFILL, 1)
+)
+_WORKFLOW_STATUS_PARAMS.update(
+    (f'w{i}', workflow) for i, (_, workflow) in enumerate(_WORKFLOW_STATUS_BACKFILL, 1)
+)
+
+_WORKFLOW_STATUS_CASE = ' '.join(
+    f'WHEN {{p}}s{i} THEN {{p}}w{i}' for i in range(1, len(_WORKFLOW_STATUS_BACKFILL) + 1)
+)
+
+# The backfill walks the task table in primary-key ranges, committing each
+# batch so locks and the log stay bounded and a rerun resumes cheaply
+_BACKFILL_BATCH_SIZE = 5000
+
+_SQL_TASK_ID_BOUNDS = text("SELECT MIN(id), MAX(id) FROM task")
+
+_SQL_BACKFILL_WORKFLOW_STATUS = text(
+    "UPDATE task SET workflow_status = CASE status "
+    f"{_WORKFLOW_STATUS_CASE.format(p=':')} ELSE :w_default END "
+    "WHERE id > :lo AND id <= :hi"
+)
+
+# sp_executesql keeps one parameterized plan in the Azure SQL plan cache
+# across runs instead of compiling a fresh literal statement each time
+_SQL_BACKFILL_WORKFLOW_STATUS_MSSQL = text(
+    "EXEC sp_executesql "
+    "N'UPDATE task SET workflow_status = CASE status "
+    f"{_WORKFLOW_STATUS_CASE.format(p='@')} ELSE @w_default END "
+    "WHERE id > @lo AND id <= @hi', "
+    "N'" + ', '.join(f'@{name} nvarchar(20)' for name in _WORKFLOW_STATUS_PARAMS) + ", @lo int, @hi int', "
+    + ', '.join(f'@{name} = :{name}' for name in _WORKFLOW_STATUS_PARAMS) + ", @lo = :lo, @hi = :hi"
+)
+
+# Let the optimizer pick up the backfilled column immediately
+_SQL_RECOMPILE_TASK = text("EXEC sp_recompile 'task'")
+
+# Basic indexes for sharing and task tables, without the CREATE INDEX prefix:
+# SQL Server has no IF NOT EXISTS, every other dialect gets it so re-runs are
+# no-ops. The dialect's WITH clause is appended at run time
+_BASIC_INDEXES = (
+    "idx_project_collaborators_project_id ON project_collaborators(project_id)",
+    "idx_project_collaborators_user_id ON project_collaborators(user_id)",
+    "idx_sharing_tokens_project_id ON sharing_tokens(project_id)",
+    "idx_sharing_tokens_token ON sharing_tokens(token)",
+    "idx_sharing_activity_log_project_id ON sharing_activity_log(project_id)",
+    "idx_sharing_activity_log_created_at ON sharing_activity_log(created_at)",
+    "idx_task_is_flagged ON task(is_flagged)",
+    "idx_task_flagged_by ON task(flagged_by)",
+    "idx_task_flag_resolved ON task(flag_resolved)",
+    "ix_task_project_parent ON task(project_id, parent_id)",
+    "ix_project_owner_id ON project(owner_id, id)",
+    "ix_label_project_id ON label(project_id)",
+    "ix_task_labels_label_id ON task_labels(label_id)",
+)
+
+# Expression index backing the case-insensitive OAuth email lookup; SQL Server's
+# default collation is case-insensitive, so its unique email index already serves it
+_USER_EMAIL_LOWER_INDEX = 'CREATE INDEX IF NOT EXISTS ix_user_email_lower ON "user" (lower(email))'
+
+# Covering index for the 30-day sharing activity window so the monitoring
+# view reads it index-only; SQLite has no INCLUDE, so the columns join the key
+_SHARING_ACTIVITY_COVERING_INDEX = {
+    'mssql': (
+        "CREATE NONCLUSTERED INDEX ix_sal_created_proj_action ON sharing_activity_log(created_at DESC) "
+        "INCLUDE (project_id, action, user_id, ip_address)"
+    ),
+    'postgresql': (
+        "CREATE INDEX IF NOT EXISTS ix_sal_created_proj_action ON sharing_activity_log(created_at DESC) "
+        "INCLUDE (project_id, action, user_id, ip_address)"
+    ),
+}
+
+_SHARING_ACTIVITY_COVERING_INDEX_DEFAULT = (
+    "CREATE INDEX IF NOT EXISTS ix_sal_created_proj_action "
+    "ON sharing_activity_log(created_at DESC, project_id, action, user_id, ip_address)"
+)
+
+# Columns every sharing table must have after migration
+_VALIDATION_REQUIRED_COLUMNS = {
+    'project_collaborators': ('id', 'project_id', 'user_id', 'role', 'status'),
+    'sharing_tokens': ('id', 'token', 'project_id', 'expires_at', 'is_active'),
+}
+
+_SQL_VALIDATION_COLUMNS = text("""
+    SELECT table_name, column_name FROM information_schema.columns
+    WHERE table_name IN :tables
+""").bindparams(bindparam('tables', expanding=True))
+
+# Non-primary-key index count, matching what the inspector reports
+_SQL_COUNT_INDEXES = {
+    'mssql': text("""
+        SELECT COUNT(*) FROM sys.indexes
+        WHERE object_id = OBJECT_ID(:table) AND index_id > 0 AND is_primary_key = 0
+    """),
+    'postgresql': text("""
+        SELECT COUNT(*) FROM pg_index i JOIN pg_class c ON c.oid = i.indrelid
+        WHERE c.relname = :table AND NOT i.indisprimary
+    """),
+}
+
+_SQL_DATABASE_EDITION = text("SELECT DATABASEPROPERTYEX(DB_NAME(), 'Edition') as edition")
+
+# SQLite tuning for the migration's connection: synchronous=NORMAL avoids
+# an fsync per statement, and a 256 MB page cache plus in-memory temp storage
+# keep table rebuilds and index sorts off disk. These are per-connection
+# settings; the previous values are restored before the connection goes back
+# to the pool. journal_mode is left alone because it persists in the file.
+_SQLITE_MIGRATION_PRAGMAS = (
+    ('synchronous', 'NORMAL'),
+    ('cache_size', '-262144'),
+    ('temp_store', 'MEMORY'),
+    ('mmap_size', '268435456'),
+    ('busy_timeout', '5000'),
+)
+
+# Azure SQL tiers known to build indexes online; any other edition, including
+# on-premises ones and an unknown edition, builds them offline
+_ONLINE_INDEX_EDITIONS = frozenset({'Premium', 'GeneralPurpose', 'BusinessCritical', 'Hyperscale'})
+
+# Database-level settings are only altered when they differ, so re-runs
+# skip the catalog update entirely
+_SQL_ENABLE_QUERY_STORE = text("""
+    IF (SELECT actual_state FROM sys.database_query_store_options) <> 2
+        ALTER DATABASE CURRENT SET QUERY_STORE = ON
+""")
+
+_SQL_SET_COMPATIBILITY_LEVEL = text("""
+    IF (SELECT compatibility_level FROM sys.databases WHERE name = DB_NAME()) <> 160
+        ALTER DATABASE CURRENT SET COMPATIBILITY_LEVEL = 160
+""")
+
+
+# Distinct users/IPs are counted from pre-grouped subqueries rather than
+# COUNT(DISTINCT ...), which forces a single serial sort/hash pass per group
+_SHARING_ACTIVITY_SUMMARY_VIEW = """
+        {create} v_sharing_activity_summary AS
+        WITH recent AS (
+            SELECT project_id, action, user_id, ip_address, created_at
+            FROM sharing_activity_log
+            WHERE created_at >= {window_start}
+        ),
+        totals AS (
+            SELECT project_id, action, COUNT(*) as activity_count, MAX(created_at) as last_activity
+            FROM recent
+            GROUP BY project_id, action
+        ),
+        users AS (
+            SELECT project_id, action, COUNT(*) as unique_users
+            FROM (
+                SELECT project_id, action, user_id
+                FROM recent
+                WHERE user_id IS NOT NULL
+                GROUP BY project_id, action, user_id
+            ) distinct_users
+            GROUP BY project_id, action
+        ),
+        ips AS (
+            SELECT project_id, action, COUNT(*) as unique_ips
+            FROM (
+                SELECT project_id, action, ip_address
+                FROM recent
+                WHERE ip_address IS NOT NULL
+                GROUP BY project_id, action, ip_address
+            ) distinct_ips
+            GROUP BY project_id, action
+        )
+        SELECT 
+            t.project_id,
+            t.action,
+            t.activity_count,
+            t.last_activity,
+            COALESCE(u.unique_users, 0) as unique_users,
+            COALESCE(i.unique_ips, 0) as unique_ips
+        FROM totals t
+        LEFT JOIN users u ON u.project_id = t.project_id AND u.action = t.action
+        LEFT JOIN ips i ON i.project_id = t.project_id AND i.action = t.action
+"""
+
+# SQL Server's plain view is evaluated on every read, so the dashboard's
+# distinct users/IPs use the native HyperLogLog APPROX_COUNT_DISTINCT: one
+# streaming aggregate with bounded memory per group, within about 2%
+_MSSQL_SHARING_ACTIVITY_SUMMARY_VIEW = """
+        CREATE OR ALTER VIEW v_sharing_activity_summary AS
+        SELECT 
+            project_id,
+            action,
+            COUNT(*) as activity_count,
+            MAX(created_at) as last_activity,
+            APPROX_COUNT_DISTINCT(user_id) as unique_users,
+            APPROX_COUNT_DISTINCT(ip_address) as unique_ips
+        FROM sharing_activity_log
+        WHERE created_at >= DATEADD(day, -30, GETUTCDATE())
+        GROUP BY project_id, action
+"""
+
+# Monitoring view DDL per dialect; anything unrecognised gets the simple
+# SQLite views
+_MSSQL_MONITORING_VIEWS = [
+    ('v_active_collaborations', text("""
+        CREATE OR ALTER VIEW v_active_collaborations AS
+        SELECT 
+            pc.project_id,
+            p.name as project_name,
+            pc.user_id,
+            u.name as user_name,
+            u.email as user_email,
+            pc.role,
+            pc.status,
+            pc.invited_at,
+            pc.accepted_at,
+            DATEDIFF(day, pc.invited_at, GETUTCDATE()) as days_since_invitation
+        FROM project_collaborators pc
+        JOIN project p ON pc.project_id = p.id
+        JOIN [user] u ON pc.user_id = u.id
+        WHERE pc.status = 'accepted'
+    """)),
+    ('v_sharing_activity_summary', text(_MSSQL_SHARING_ACTIVITY_SUMMARY_VIEW)),
+]
+
+# PostgreSQL materializes the sharing activity summary; a plain view left by an
+# earlier migration is dropped first so the materialized one can take its name.
+# The unique index is what allows REFRESH MATERIALIZED VIEW CONCURRENTLY.
+_PG_REPLACE_PLAIN_VIEW = """
+        DO $$ BEGIN
+            IF EXISTS (SELECT 1 FROM pg_views WHERE viewname = '{name}') THEN
+                DROP VIEW {name};
+            END IF;
+        END $$;
+"""
+
+# v_active_collaborations is backed by a table kept current by row-level
+# triggers, so collaborator changes upsert one row instead of a periodic full
+# recompute of the three-way join. days_since_invitation depends on the clock,
+# so the view still derives it on read.
+_PG_ACTIVE_COLLABORATIONS_ROLLUP = """
+        DO $$ BEGIN
+            IF EXISTS (SELECT 1 FROM pg_matviews WHERE matviewname = 'v_active_collaborations') THEN
+                DROP MATERIALIZED VIEW v_active_collaborations;
+            END IF;
+        END $$;
+        
+        CREATE TABLE IF NOT EXISTS active_collaborations_rollup (
+            project_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            project_name VARCHAR(200),
+            user_name VARCHAR(100),
+            user_email VARCHAR(120),
+            role VARCHAR(20),
+            status VARCHAR(20),
+            invited_at TIMESTAMP,
+            accepted_at TIMESTAMP,
+            PRIMARY KEY (project_id, user_id)
+        );
+        
+        CREATE OR REPLACE FUNCTION sync_active_collaboration() RETURNS trigger AS $fn$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM active_collaborations_rollup
+                WHERE project_id = OLD.project_id AND user_id = OLD.user_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'accepted' THEN
+                INSERT INTO active_collaborations_rollup (
+                    project_id, user_id, project_name, user_name, user_email,
+                    role, status, invited_at, accepted_at
+                )
+                SELECT NEW.project_id, NEW.user_id, p.name, u.name, u.email,
+                       NEW.role, NEW.status, NEW.invited_at, NEW.accepted_at
+                FROM project p, "user" u
+                WHERE p.id = NEW.project_id AND u.id = NEW.user_id
+                ON CONFLICT (project_id, user_id) DO UPDATE SET
+                    project_name = EXCLUDED.project_name,
+                    user_name = EXCLUDED.user_name,
+                    user_email = EXCLUDED.user_email,
+                    role = EXCLUDED.role,
+                    status = EXCLUDED.status,
+                    invited_at = EXCLUDED.invited_at,
+                    accepted_at = EXCLUDED.accepted_at;
+            END IF;
+            RETURN NULL;
+        END $fn$ LANGUAGE plpgsql;
+        
+        CREATE OR REPLACE FUNCTION sync_active_collaboration_project() RETURNS trigger AS $fn$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                DELETE FROM active_collaborations_rollup WHERE project_id = OLD.id;
+            ELSE
+                UPDATE active_collaborations_rollup SET project_name = NEW.name
+                WHERE project_id = NEW.id;
+            END IF;
+            RETURN NULL;
+        END $fn$ LANGUAGE plpgsql;
+        
+        CREATE OR REPLACE FUNCTION sync_active_collaboration_user() RETURNS trigger AS $fn$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                DELETE FROM active_collaborations_rollup WHERE user_id = OLD.id;
+            ELSE
+                UPDATE active_collaborations_rollup SET user_name = NEW.name, user_email = NEW.email
+                WHERE user_id = NEW.id;
+            END IF;
+            RETURN NULL;
+        END $fn$ LANGUAGE plpgsql;
+        
+        DROP TRIGGER IF EXISTS trg_active_collaborations ON project_collaborators;
+        CREATE TRIGGER trg_active_collaborations
+        AFTER INSERT OR UPDATE OR DELETE ON project_collaborators
+        FOR EACH ROW EXECUTE FUNCTION sync_active_collaboration();
+        
+        DROP TRIGGER IF EXISTS trg_active_collaborations_project ON project;
+        CREATE TRIGGER trg_active_collaborations_project
+        AFTER UPDATE OF name OR DELETE ON project
+        FOR EACH ROW EXECUTE FUNCTION sync_active_collaboration_project();
+        
+        DROP TRIGGER IF EXISTS trg_active_collaborations_user ON "user";
+        CREATE TRIGGER trg_active_collaborations_user
+        AFTER UPDATE OF name, email OR DELETE ON "user"
+        FOR EACH ROW EXECUTE FUNCTION sync_active_collaboration_user();
+        
+        -- Resynchronise once per migration; the triggers keep it current afterwards
+        TRUNCATE active_collaborations_rollup;
+        INSERT INTO active_collaborations_rollup (
+            project_id, user_id, project_name, user_name, user_email,
+            role, status, invited_at, accepted_at
+        )
+        SELECT pc.project_id, pc.user_id, p.name, u.name, u.email,
+               pc.role, pc.status, pc.invited_at, pc.accepted_at
+        FROM project_collaborators pc
+        JOIN project p ON pc.project_id = p.id
+        JOIN "user" u ON pc.user_id = u.id
+        WHERE pc.status = 'accepted';
+        
+        CREATE OR REPLACE VIEW v_active_collaborations AS
+        SELECT 
+            project_id,
+            project_name,
+            user_id,
+            user_name,
+            user_email,
+            role,
+            status,
+            invited_at,
+            accepted_at,
+            EXTRACT(days FROM (NOW() AT TIME ZONE 'UTC' - invited_at)) as days_since_invitation
+        FROM active_collaborations_rollup;
+"""
+
+_POSTGRES_MONITORING_VIEWS = [
+    ('v_active_collaborations', text(_PG_ACTIVE_COLLABORATIONS_ROLLUP)),
+    ('v_sharing_activity_summary', text(
+        _PG_REPLACE_PLAIN_VIEW.format(name='v_sharing_activity_summary')
+        + _SHARING_ACTIVITY_SUMMARY_VIEW.format(
+            create='CREATE MATERIALIZED VIEW IF NOT EXISTS',
+            window_start="(NOW() AT TIME ZONE 'UTC' - INTERVAL '30 days')"
+        )
+        + """
+        WITH DATA;
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_v_sharing_activity_summary
+        ON v_sharing_activity_summary(project_id, action);
+    """)),
+]
+
+_SQLITE_MONITORING_VIEWS = [
+    ('v_active_collaborations', text("""
+        CREATE VIEW IF NOT EXISTS v_active_collaborations AS
+        SELECT 
+            pc.project_id,
+            p.name as project_name,
+            pc.user_id,
+            u.name as user_name,
+            u.email as user_email,
+            pc.role,
+            pc.status,
+            pc.invited_at,
+            pc.accepted_at
+        FROM project_collaborators pc
+        JOIN project p ON pc.project_id = p.id
+        JOIN user u ON pc.user_id = u.id
+        WHERE pc.status = 'accepted'
+    """)),
+]
+
+# Materialized monitoring views are refreshed by pg_cron when it is installed;
+# refresh jobs for views now maintained by triggers are removed
+_PG_MATERIALIZED_VIEWS = ('v_sharing_activity_summary',)
+
+_PG_TRIGGER_MAINTAINED_VIEWS = ('v_active_collaborations',)
+
+_MATERIALIZED_VIEW_REFRESH_SCHEDULE = '*/5 * * * *'
+
+_SQL_PG_CRON_INSTALLED = text("SELECT 1 FROM pg_extension WHERE extname = 'pg_cron'")
+
+_SQL_PG_CRON_SCHEDULE = text("SELECT cron.schedule(:job_name, :schedule, :command)")
+
+_SQL_PG_CRON_UNSCHEDULE = text("SELECT cron.unschedule(jobid) FROM cron.job WHERE jobname = :job_name")
+
+_MONITORING_VIEWS = {
+    'mssql': _MSSQL_MONITORING_VIEWS,
+    'postgresql': _POSTGRES_MONITORING_VIEWS,
+    'sqlite': _SQLITE_MONITORING_VIEWS,
+}
+
 
 class AzureProductionMigration:
     """Production-ready migration for Azure deployment"""
     
     def __init__(self):
+        # (nanoseconds since start, message) pairs, formatted only in the report
         self.migration_log = []
+        self._started_at = datetime.utcnow()
+        self._started_ns = time.monotonic_ns()
         self.rollback_steps = []
+        self._dialect = None
+        self._is_mssql = False
+        self._is_postgres = False
+        self._mssql_index_options = None
+        self._task_columns = frozenset()
+        # Set by steps that log a failure but let the migration continue
+        self._had_failures = False
     
-    def run_production_migration(self) -> bool:
+    def run_production_migration(self, force: bool = False) -> bool:
         """
         Run complete production migration for Azure deployment
         
+        Args:
+            force: Run every step even if this migration version is recorded
+        
         Returns:
             bool: True if successful, False otherwise
         """
@@ -40,86 +534,144 @@ class AzureProductionMigration:
             globals()['db'] = db
             
             with app.app_context():
+                # Resolve the dialect once instead of rendering the URL per phase
+                self._dialect = db.engine.dialect.name
+                self._is_mssql = self._dialect in ('mssql', 'pyodbc')
+                self._is_postgres = self._dialect == 'postgresql'
+                
                 logger.info("Starting Azure production migration...")
                 self._log_step("Migration started")
                 
-                # Step 1: Validate database connection
-                if not self._validate_database_connection(db):
-                    return False
-                
-                # Step 2: Create tables if they don't exist
-                if not self._create_tables(db):
-                    return False
-                
-                # Step 2.5: Run task assignment migration
-                if not self._run_task_assignment_migration(db):
-                    return False
-                
-                # Step 2.6: Run task workflow migration
-                if not self._run_task_workflow_migration(db):
-                    return False
-                
-                # Step 2.7: Run task flagging migration
-                if not self._run_task_flagging_migration(db):
-                    return False
-                
-                # Step 2.8: Run task tracking migration
-                if not self._run_task_tracking_migration(db):
-                    return False
-                
-                # Step 3: Create optimized indexes
-                if not self._create_indexes(db.engine):
-                    return False
-                
-                # Step 4: Create backup and cleanup procedures
-                if not self._create_backup_procedures(db.engine):
-                    return False
-                
-                # Step 5: Optimize database settings
-                if not self._optimize_database_settings(db.engine):
-                    return False
-                
-                # Step 6: Validate migration
-                if not self._validate_migration(db):
-                    return False
-                
-                # Step 7: Create monitoring views
-                if not self._create_monitoring_views(db.engine):
-                    return False
-                
-                logger.info("✓ Azure production migration completed successfully!")
-                self._log_step("Migration completed successfully")
-                
-                # Generate migration report
-                self._generate_migration_report()
-                
-                return True
+                # Share one connection across the DDL phases instead of
+                # checking one out per phase
+                with db.engine.connect() as conn:
+                    if not force and self._migration_applied(conn):
+                        logger.info("Migration %s already applied, skipping", _MIGRATION_VERSION)
+                        return True
+                    
+                    # The PRAGMAs are per-connection, so they are undone whatever
+                    # happens before the connection goes back to the app's pool
+                    sqlite_pragmas = self._tune_sqlite(conn) if self._dialect == 'sqlite' else {}
+                    try:
+                        return self._run_steps(db, conn)
+                    finally:
+                        if sqlite_pragmas:
+                            self._restore_sqlite(conn, sqlite_pragmas)
                 
         except Exception as e:
-            logger.error(f"✗ Production migration failed: {str(e)}")
+            logger.error("✗ Production migration failed: %s", e)
             self._log_step(f"Migration failed: {str(e)}")
             return False
     
-    def _validate_database_connection(self, db) -> bool:
+    def _run_steps(self, db, conn) -> bool:
+        """Run every migration step on the shared connection"""
+        # Step 1: Validate database connection
+        if not self._validate_database_connection(db, conn):
+            return False
+        
+        # Step 2: Create tables if they don't exist
+        if not self._create_tables(db):
+            return False
+        
+        # One reflection pass shared by the task migrations below;
+        # each only checks its own disjoint set of columns
+        self._task_columns = self._reflect_task_columns(conn)
+        
+        # Step 2.5: Run task assignment migration
+        if not self._run_task_assignment_migration(db, conn):
+            return False
+        
+        # Step 2.6: Run task workflow migration
+        if not self._run_task_workflow_migration(db, conn):
+            return False
+        
+        # Step 2.7: Run task flagging migration
+        if not self._run_task_flagging_migration(db, conn):
+            return False
+        
+        # Step 2.8: Run task tracking migration
+        if not self._run_task_tracking_migration(db, conn):
+            return False
+        
+        # Step 3: Create optimized indexes
+        if not self._create_indexes(conn):
+            return False
+        
+        # Step 4: Create backup and cleanup procedures
+        if not self._create_backup_procedures(db.engine):
+            return False
+        
+        # Step 5: Optimize database settings
+        if not self._optimize_database_settings(db.engine):
+            return False
+        
+        # Step 6: Validate migration
+        if not self._validate_migration(db, conn):
+            return False
+        
+        # Step 7: Create monitoring views
+        if not self._create_monitoring_views(conn):
+            return False
+        
+        # Only a fully successful run is recorded; otherwise the next startup
+        # retries the steps that failed
+        if self._had_failures:
+            logger.warning("Some migration steps failed, not recording %s", _MIGRATION_VERSION)
+            self._log_step("Migration version not recorded because some steps failed")
+        else:
+            self._record_migration(conn)
+        
+        logger.info("✓ Azure production migration completed successfully!")
+        self._log_step("Migration completed successfully")
+        
+        # Generate migration report
+        self._generate_migration_report()
+        
+        return True
+    
+    def _migration_applied(self, conn) -> bool:
+        """Check the schema_migrations sentinel for this migration version"""
+        try:
+            with conn.begin():
+                row = conn.execute(
+                    _SQL_MIGRATION_APPLIED, {'version': _MIGRATION_VERSION}
+                ).first()
+            return row is not None
+        except Exception:
+            # No sentinel table yet, so this database has never been migrated
+            return False
+    
+    def _record_migration(self, conn) -> None:
+        """Insert the sentinel row so later startups skip the migration"""
+        create_sql = (
+            _SQL_MSSQL_CREATE_SCHEMA_MIGRATIONS if self._is_mssql
+            else _SQL_CREATE_SCHEMA_MIGRATIONS
+        )
+        with conn.begin():
+            conn.execute(create_sql)
+            if conn.execute(_SQL_MIGRATION_APPLIED, {'version': _MIGRATION_VERSION}).first() is None:
+                conn.execute(_SQL_RECORD_MIGRATION, {
+                    'version': _MIGRATION_VERSION,
+                    'applied_at': datetime.utcnow(),
+                })
+        self._log_step(f"Recorded migration version {_MIGRATION_VERSION}")
+    
+    def _validate_database_connection(self, db, conn) -> bool:
         """Validate database connection and Azure compatibility"""
         try:
             logger.info("Validating database connection...")
             
             # Test basic connection
-            with db.engine.connect() as conn:
-                result = conn.execute(db.text("SELECT 1 as test"))
+            with conn.begin():
+                result = conn.execute(_SQL_SELECT_ONE)
                 if not result.fetchone():
                     raise Exception("Database connection test failed")
             
             # Check if running on Azure SQL Database
-            database_url = str(db.engine.url)
-            is_azure_sql = 'mssql' in database_url or 'sqlserver' in database_url
-            is_azure_postgres = 'postgresql' in database_url and ('azure' in database_url or 'postgres.database.azure.com' in database_url)
-            
-            if is_azure_sql:
+            if self._is_mssql:
                 logger.info("✓ Detected Azure SQL Database")
                 self._validate_azure_sql_features(db.engine)
-            elif is_azure_postgres:
+            elif self._is_postgres:
                 logger.info("✓ Detected Azure Database for PostgreSQL")
                 self._validate_azure_postgres_features(db.engine)
             else:
@@ -129,52 +681,89 @@ class AzureProductionMigration:
             return True
             
         except Exception as e:
-            logger.error(f"Database connection validation failed: {e}")
+            logger.error("Database connection validation failed: %s", e)
             return False
     
     def _validate_azure_sql_features(self, engine):
         """Validate Azure SQL Database specific features"""
         try:
-            with engine.connect() as conn:
-                # Check Azure SQL Database version and features
-                version_result = conn.execute(db.text("SELECT @@VERSION as version")).fetchone()
-                logger.info(f"Azure SQL Database version: {version_result.version[:100]}...")
-                
-                # Check if we have necessary permissions
-                permissions_check = conn.execute(db.text("""
-                    SELECT 
-                        HAS_PERMS_BY_NAME(NULL, NULL, 'CREATE TABLE') as can_create_table,
-                        HAS_PERMS_BY_NAME(NULL, NULL, 'CREATE INDEX') as can_create_index,
-                        HAS_PERMS_BY_NAME(NULL, NULL, 'CREATE PROCEDURE') as can_create_procedure
-                """)).fetchone()
-                
-                if not all([permissions_check.can_create_table, permissions_check.can_create_index]):
-                    raise Exception("Insufficient database permissions for migration")
-                
-                logger.info("✓ Azure SQL Database permissions validated")
-                
+            # Check Azure SQL Database version and permissions together
+            version_rows, permission_rows = self._run_probes(engine, _SQL_VERSION, _SQL_PERMS)
+            version_result = version_rows[0]
+            logger.info("Azure SQL Database version: %s...", version_result.version[:100])
+            
+            # Check if we have necessary permissions
+            permissions_check = permission_rows[0]
+            
+            if not all([permissions_check.can_create_table, permissions_check.can_create_index]):
+                raise Exception("Insufficient database permissions for migration")
+            
+            logger.info("✓ Azure SQL Database permissions validated")
+            
         except Exception as e:
-            logger.warning(f"Azure SQL validation warning: {e}")
+            logger.warning("Azure SQL validation warning: %s", e)
     
     def _validate_azure_postgres_features(self, engine):
         """Validate Azure Database for PostgreSQL specific features"""
         try:
-            with engine.connect() as conn:
-                # Check PostgreSQL version
-                version_result = conn.execute(db.text("SELECT version()")).fetchone()
-                logger.info(f"PostgreSQL version: {version_result.version[:100]}...")
-                
-                # Check available extensions
-                extensions_result = conn.execute(db.text("""
-                    SELECT name FROM pg_available_extensions 
-                    WHERE name IN ('pg_stat_statements', 'pg_buffercache')
-                """)).fetchall()
-                
-                available_extensions = [row.name for row in extensions_result]
-                logger.info(f"Available extensions: {available_extensions}")
-                
+            # Check PostgreSQL version and available extensions together
+            version_rows, extensions_result = self._run_probes(
+                engine, _SQL_PG_VERSION, _SQL_PG_EXTENSIONS
+            )
+            version_result = version_rows[0]
+            logger.info("PostgreSQL version: %s...", version_result.version[:100])
+            
+            available_extensions = [row.name for row in extensions_result]
+            logger.info("Available extensions: %s", available_extensions)
+            
         except Exception as e:
-            logger.warning(f"Azure PostgreSQL validation warning: {e}")
+            logger.warning("Azure PostgreSQL validation warning: %s", e)
+    
+    def _tune_sqlite(self, conn) -> Dict[str, object]:
+        """
+        Apply migration-friendly PRAGMAs to the shared SQLite connection
+        
+        Returns:
+            Dict[str, object]: The previous value of every PRAGMA that was changed
+        """
+        previous = {}
+        try:
+            with conn.begin():
+                for name, value in _SQLITE_MIGRATION_PRAGMAS:
+                    current = conn.execute(text(f"PRAGMA {name}")).scalar()
+                    if current is None:
+                        continue  # not supported by this SQLite build
+                    previous[name] = current
+                    conn.execute(text(f"PRAGMA {name}={value}"))
+            logger.info("✓ Tuned SQLite PRAGMAs for migration")
+        except Exception as e:
+            logger.warning("Could not tune SQLite PRAGMAs: %s", e)
+        return previous
+    
+    def _restore_sqlite(self, conn, previous: Dict[str, object]):
+        """Put the PRAGMAs changed by _tune_sqlite back before the connection returns to the pool"""
+        try:
+            with conn.begin():
+                for name, value in previous.items():
+                    conn.execute(text(f"PRAGMA {name}={value}"))
+        except Exception as e:
+            # Never hand a still-tuned connection back to the app's pool
+            logger.warning("Could not restore SQLite PRAGMAs, discarding the connection: %s", e)
+            conn.invalidate()
+    
+    def _run_probes(self, engine, *statements) -> List[list]:
+        """
+        Run independent read-only probes concurrently, one pooled connection each
+        
+        Returns:
+            List[list]: Fetched rows for each statement, in argument order
+        """
+        def fetch(statement):
+            with engine.connect() as conn:
+                return conn.execute(statement).fetchall()
+        
+        with ThreadPoolExecutor(max_workers=len(statements)) as executor:
+            return list(executor.map(fetch, statements))
     
     def _create_tables(self, db) -> bool:
         """Create database tables with Azure optimizations"""
@@ -186,7 +775,7 @@ class AzureProductionMigration:
             
             # Verify critical sharing tables exist
             inspector = db.inspect(db.engine)
-            existing_tables = inspector.get_table_names()
+            existing_tables = frozenset(inspector.get_table_names())
             
             required_tables = [
                 'project_collaborators',
@@ -199,33 +788,24 @@ class AzureProductionMigration:
             if missing_tables:
                 raise Exception(f"Failed to create tables: {missing_tables}")
             
-            logger.info(f"✓ Created {len(required_tables)} sharing tables")
+            logger.info("✓ Created %s sharing tables", len(required_tables))
             self._log_step(f"Created tables: {', '.join(required_tables)}")
             
             return True
             
         except Exception as e:
-            logger.error(f"Table creation failed: {e}")
+            logger.error("Table creation failed: %s", e)
             return False
     
-    def _run_task_assignment_migration(self, db) -> bool:
+    def _run_task_assignment_migration(self, db, conn) -> bool:
         """Run task assignment migration to add new fields"""
         try:
             logger.info("Running task assignment migration...")
             
-            from sqlalchemy import inspect, text
-            
-            # Check if the columns already exist
-            inspector = inspect(db.engine)
-            columns = [col['name'] for col in inspector.get_columns('task')]
-            
             new_columns = ['assigned_to', 'assigned_by', 'assigned_at']
-            existing_columns = [col for col in new_columns if col in columns]
             
-            if existing_columns:
-                logger.info(f"Task assignment columns already exist: {existing_columns}")
-                self._log_step(f"Task assignment columns already exist: {existing_columns}")
-                return True
+            # Check if the columns already exist
+            columns = self._task_columns
             
             columns_to_add = [col for col in new_columns if col not in columns]
             
@@ -235,7 +815,8 @@ class AzureProductionMigration:
                 return True
             
             # Add the new columns
-            with db.engine.connect() as conn:
+            added_columns = []
+            with conn.begin():
                 # Add assigned_to column
                 if 'assigned_to' not in columns:
                     try:
@@ -244,8 +825,9 @@ class AzureProductionMigration:
                             ADD assigned_to INTEGER REFERENCES [user](id)
                         """))
                         logger.info("✓ Added 'assigned_to' column")
+                        added_columns.append('assigned_to')
                     except Exception as e:
-                        logger.warning(f"Could not add 'assigned_to' column: {e}")
+                        logger.warning("Could not add 'assigned_to' column: %s", e)
                 
                 # Add assigned_by column
                 if 'assigned_by' not in columns:
@@ -255,8 +837,9 @@ class AzureProductionMigration:
                             ADD assigned_by INTEGER REFERENCES [user](id)
                         """))
                         logger.info("✓ Added 'assigned_by' column")
+                        added_columns.append('assigned_by')
                     except Exception as e:
-                        logger.warning(f"Could not add 'assigned_by' column: {e}")
+                        logger.warning("Could not add 'assigned_by' column: %s", e)
                 
                 # Add assigned_at column
                 if 'assigned_at' not in columns:
@@ -266,51 +849,36 @@ class AzureProductionMigration:
                             ADD assigned_at DATETIME2
                         """))
                         logger.info("✓ Added 'assigned_at' column")
+                        added_columns.append('assigned_at')
                     except Exception as e:
-                        logger.warning(f"Could not add 'assigned_at' column: {e}")
-                
-                conn.commit()
-            
-            # Verify columns were added
-            inspector = inspect(db.engine)
-            updated_columns = [col['name'] for col in inspector.get_columns('task')]
-            
-            added_columns = [col for col in new_columns if col in updated_columns]
+                        logger.warning("Could not add 'assigned_at' column: %s", e)
             
+            # Successful ALTERs were recorded above, so no second metadata scan is needed
             if len(added_columns) == len(columns_to_add):
-                logger.info(f"✓ Task assignment migration completed! Added {len(added_columns)} columns.")
+                logger.info("✓ Task assignment migration completed! Added %s columns.", len(added_columns))
                 self._log_step(f"Added task assignment columns: {added_columns}")
                 
                 # Add indexes for performance
-                self._add_task_assignment_indexes(db.engine)
+                self._add_task_assignment_indexes(conn)
                 
                 return True
             else:
-                logger.error(f"Task assignment migration partially failed. Added {len(added_columns)}/{len(columns_to_add)} columns.")
+                logger.error("Task assignment migration partially failed. Added %s/%s columns.", len(added_columns), len(columns_to_add))
                 return False
                 
         except Exception as e:
-            logger.error(f"Task assignment migration failed: {str(e)}")
+            logger.error("Task assignment migration failed: %s", e)
             return False
     
-    def _run_task_workflow_migration(self, db) -> bool:
+    def _run_task_workflow_migration(self, db, conn) -> bool:
         """Run task workflow migration to add workflow columns"""
         try:
             logger.info("Running task workflow migration...")
             
-            from sqlalchemy import inspect, text
-            
-            # Check if the columns already exist
-            inspector = inspect(db.engine)
-            columns = [col['name'] for col in inspector.get_columns('task')]
-            
             new_columns = ['workflow_status', 'started_at', 'committed_at', 'completed_at']
-            existing_columns = [col for col in new_columns if col in columns]
             
-            if existing_columns:
-                logger.info(f"Task workflow columns already exist: {existing_columns}")
-                self._log_step(f"Task workflow columns already exist: {existing_columns}")
-                return True
+            # Check if the columns already exist
+            columns = self._task_columns
             
             columns_to_add = [col for col in new_columns if col not in columns]
             
@@ -320,7 +888,8 @@ class AzureProductionMigration:
                 return True
             
             # Add the new columns
-            with db.engine.connect() as conn:
+            added_columns = []
+            with conn.begin():
                 # Add workflow_status column
                 if 'workflow_status' not in columns:
                     try:
@@ -329,8 +898,9 @@ class AzureProductionMigration:
                             ADD workflow_status VARCHAR(20) DEFAULT 'backlog'
                         """))
                         logger.info("✓ Added 'workflow_status' column")
+                        added_columns.append('workflow_status')
                     except Exception as e:
-                        logger.warning(f"Could not add 'workflow_status' column: {e}")
+                        logger.warning("Could not add 'workflow_status' column: %s", e)
                 
                 # Add started_at column
                 if 'started_at' not in columns:
@@ -340,8 +910,9 @@ class AzureProductionMigration:
                             ADD started_at DATETIME2
                         """))
                         logger.info("✓ Added 'started_at' column")
+                        added_columns.append('started_at')
                     except Exception as e:
-                        logger.warning(f"Could not add 'started_at' column: {e}")
+                        logger.warning("Could not add 'started_at' column: %s", e)
                 
                 # Add committed_at column
                 if 'committed_at' not in columns:
@@ -351,8 +922,9 @@ class AzureProductionMigration:
                             ADD committed_at DATETIME2
                         """))
                         logger.info("✓ Added 'committed_at' column")
+                        added_columns.append('committed_at')
                     except Exception as e:
-                        logger.warning(f"Could not add 'committed_at' column: {e}")
+                        logger.warning("Could not add 'committed_at' column: %s", e)
                 
                 # Add completed_at column
                 if 'completed_at' not in columns:
@@ -362,171 +934,197 @@ class AzureProductionMigration:
                             ADD completed_at DATETIME2
                         """))
                         logger.info("✓ Added 'completed_at' column")
+                        added_columns.append('completed_at')
                     except Exception as e:
-                        logger.warning(f"Could not add 'completed_at' column: {e}")
-                
-                # Update existing tasks to have proper workflow_status based on their current status
+                        logger.warning("Could not add 'completed_at' column: %s", e)
+            
+            # Update existing tasks to have proper workflow_status based on their current status;
+            # a column that already existed holds live workflow state and is left alone
+            if 'workflow_status' in added_columns:
                 try:
-                    conn.execute(text("""
-                        UPDATE task 
-                        SET workflow_status = CASE 
-                            WHEN status = 'backlog' THEN 'backlog'
-                            WHEN status = 'committed' THEN 'committed' 
-                            WHEN status = 'in_progress' THEN 'in_progress'
-                            WHEN status = 'blocked' THEN 'in_progress'  -- blocked tasks are still in progress
-                            WHEN status = 'completed' THEN 'completed'
-                            ELSE 'backlog'
-                        END
-                    """))
+                    self._backfill_workflow_status(conn)
                     logger.info("✓ Updated existing tasks with workflow_status")
                 except Exception as e:
-                    logger.warning(f"Could not update existing tasks: {e}")
-                
-                conn.commit()
-            
-            # Verify columns were added
-            inspector = inspect(db.engine)
-            updated_columns = [col['name'] for col in inspector.get_columns('task')]
-            
-            added_columns = [col for col in new_columns if col in updated_columns]
+                    logger.warning("Could not update existing tasks: %s", e)
+                    self._had_failures = True
             
+            # Successful ALTERs were recorded above, so no second metadata scan is needed
             if len(added_columns) == len(columns_to_add):
-                logger.info(f"✓ Task workflow migration completed! Added {len(added_columns)} columns.")
+                logger.info("✓ Task workflow migration completed! Added %s columns.", len(added_columns))
                 self._log_step(f"Added task workflow columns: {added_columns}")
                 
                 # Add indexes for performance
-                self._add_task_workflow_indexes(db.engine)
+                self._add_task_workflow_indexes(conn)
                 
                 return True
             else:
-                logger.error(f"Task workflow migration partially failed. Added {len(added_columns)}/{len(columns_to_add)} columns.")
+                logger.error("Task workflow migration partially failed. Added %s/%s columns.", len(added_columns), len(columns_to_add))
                 return False
                 
         except Exception as e:
-            logger.error(f"Task workflow migration failed: {str(e)}")
+            logger.error("Task workflow migration failed: %s", e)
             return False
     
-    def _add_task_assignment_indexes(self, engine):
+    def _backfill_workflow_status(self, conn):
+        """Backfill workflow_status from status in committed primary-key batches"""
+        with conn.begin():
+            low, high = conn.execute(_SQL_TASK_ID_BOUNDS).first()
+        
+        if low is None:
+            return
+        
+        statement = _SQL_BACKFILL_WORKFLOW_STATUS_MSSQL if self._is_mssql else _SQL_BACKFILL_WORKFLOW_STATUS
+        for lo in range(low - 1, high, _BACKFILL_BATCH_SIZE):
+            with conn.begin():
+                conn.execute(statement, dict(_WORKFLOW_STATUS_PARAMS, lo=lo, hi=lo + _BACKFILL_BATCH_SIZE))
+        
+        if self._is_mssql:
+            with conn.begin():
+                conn.execute(_SQL_RECOMPILE_TASK)
+    
+    def _reflect_task_columns(self, conn) -> frozenset:
+        """Reflect the task table's columns once on the shared connection"""
+        with conn.begin():
+            return frozenset(col['name'] for col in inspect(conn).get_columns('task'))
+    
+    def _add_task_assignment_indexes(self, conn):
         """Add database indexes for task assignment queries"""
         try:
-            from sqlalchemy import text
+            index_options = self._index_with_clause(conn)
             
             # Index for task assignment lookups
-            with engine.connect() as conn:
+            with conn.begin():
                 # Check if indexes exist before creating them
                 try:
-                    conn.execute(text("""
+                    conn.execute(text(f"""
                         CREATE INDEX idx_task_assigned_to 
-                        ON task(assigned_to)
+                        ON task(assigned_to){index_options}
                     """))
                 except Exception as e:
                     if "already exists" not in str(e).lower():
-                        logger.warning(f"Could not create assigned_to index: {e}")
+                        logger.warning("Could not create assigned_to index: %s", e)
+                        self._had_failures = True
                 
                 try:
-                    conn.execute(text("""
+                    conn.execute(text(f"""
                         CREATE INDEX idx_task_assigned_by 
-                        ON task(assigned_by)
+                        ON task(assigned_by){index_options}
                     """))
                 except Exception as e:
                     if "already exists" not in str(e).lower():
-                        logger.warning(f"Could not create assigned_by index: {e}")
+                        logger.warning("Could not create assigned_by index: %s", e)
+                        self._had_failures = True
                 
                 try:
-                    conn.execute(text("""
+                    conn.execute(text(f"""
                         CREATE INDEX idx_task_assigned_at 
-                        ON task(assigned_at)
+                        ON task(assigned_at){index_options}
                     """))
                 except Exception as e:
                     if "already exists" not in str(e).lower():
-                        logger.warning(f"Could not create assigned_at index: {e}")
+                        logger.warning("Could not create assigned_at index: %s", e)
+                        self._had_failures = True
                 
                 try:
-                    conn.execute(text("""
+                    conn.execute(text(f"""
                         CREATE INDEX idx_task_project_assigned 
-                        ON task(project_id, assigned_to)
+                        ON task(project_id, assigned_to){index_options}
                     """))
                 except Exception as e:
                     if "already exists" not in str(e).lower():
-                        logger.warning(f"Could not create project_assigned index: {e}")
-                
-                conn.commit()
+                        logger.warning("Could not create project_assigned index: %s", e)
+                        self._had_failures = True
             
             logger.info("✓ Task assignment indexes created successfully")
             
         except Exception as e:
-            logger.warning(f"Some task assignment indexes may not have been created: {str(e)}")
+            logger.warning("Some task assignment indexes may not have been created: %s", e)
+            self._had_failures = True
     
-    def _add_task_workflow_indexes(self, engine):
+    def _add_task_workflow_indexes(self, conn):
         """Add database indexes for task workflow queries"""
         try:
-            from sqlalchemy import text
+            index_options = self._index_with_clause(conn)
             
             # Index for task workflow lookups
-            with engine.connect() as conn:
+            with conn.begin():
                 # Check if indexes exist before creating them
                 try:
-                    conn.execute(text("""
+                    conn.execute(text(f"""
                         CREATE INDEX idx_task_workflow_status 
-                        ON task(workflow_status)
+                        ON task(workflow_status){index_options}
                     """))
                 except Exception as e:
                     if "already exists" not in str(e).lower():
-                        logger.warning(f"Could not create workflow_status index: {e}")
+                        logger.warning("Could not create workflow_status index: %s", e)
+                        self._had_failures = True
                 
                 try:
-                    conn.execute(text("""
+                    conn.execute(text(f"""
                         CREATE INDEX idx_task_started_at 
-                        ON task(started_at)
+                        ON task(started_at){index_options}
                     """))
                 except Exception as e:
                     if "already exists" not in str(e).lower():
-                        logger.warning(f"Could not create started_at index: {e}")
+                        logger.warning("Could not create started_at index: %s", e)
+                        self._had_failures = True
                 
                 try:
-                    conn.execute(text("""
+                    conn.execute(text(f"""
                         CREATE INDEX idx_task_committed_at 
-                        ON task(committed_at)
+                        ON task(committed_at){index_options}
                     """))
                 except Exception as e:
                     if "already exists" not in str(e).lower():
-                        logger.warning(f"Could not create committed_at index: {e}")
+                        logger.warning("Could not create committed_at index: %s", e)
+                        self._had_failures = True
                 
                 try:
-                    conn.execute(text("""
+                    conn.execute(text(f"""
                         CREATE INDEX idx_task_completed_at 
-                        ON task(completed_at)
+                        ON task(completed_at){index_options}
                     """))
                 except Exception as e:
                     if "already exists" not in str(e).lower():
-                        logger.warning(f"Could not create completed_at index: {e}")
-                
-                conn.commit()
+                        logger.warning("Could not create completed_at index: %s", e)
+                        self._had_failures = True
             
             logger.info("✓ Task workflow indexes created successfully")
             
         except Exception as e:
-            logger.warning(f"Some task workflow indexes may not have been created: {str(e)}")
+            logger.warning("Some task workflow indexes may not have been created: %s", e)
+            self._had_failures = True
+    
+    def _index_with_clause(self, conn) -> str:
+        """Return the CREATE INDEX WITH clause for the current database"""
+        if not self._is_mssql:
+            return ''
+        
+        if self._mssql_index_options is None:
+            online = 'OFF'
+            try:
+                with conn.begin():
+                    edition = conn.execute(_SQL_DATABASE_EDITION).scalar()
+                if edition in _ONLINE_INDEX_EDITIONS:
+                    online = 'ON'
+            except Exception as e:
+                logger.warning("Could not determine database edition, building indexes offline: %s", e)
+            
+            self._mssql_index_options = (
+                f" WITH (ONLINE = {online}, DATA_COMPRESSION = PAGE, SORT_IN_TEMPDB = ON)"
+            )
+        
+        return self._mssql_index_options
     
-    def _run_task_flagging_migration(self, db) -> bool:
+    def _run_task_flagging_migration(self, db, conn) -> bool:
         """Run task flagging migration to add flagging columns"""
         try:
             logger.info("Running task flagging migration...")
             
-            from sqlalchemy import inspect, text
-            
             # Check if the columns already exist
-            inspector = inspect(db.engine)
-            columns = [col['name'] for col in inspector.get_columns('task')]
+            columns = self._task_columns
             
             new_columns = ['is_flagged', 'flag_comment', 'flagged_by', 'flagged_at', 'flag_resolved', 'flag_resolved_at', 'flag_resolved_by']
-            existing_columns = [col for col in new_columns if col in columns]
-            
-            if existing_columns:
-                logger.info(f"Task flagging columns already exist: {existing_columns}")
-                self._log_step(f"Task flagging columns already exist: {existing_columns}")
-                return True
-            
             columns_to_add = [col for col in new_columns if col not in columns]
             
             if not columns_to_add:
@@ -535,7 +1133,7 @@ class AzureProductionMigration:
                 return True
             
             # Add the new columns
-            with db.engine.connect() as conn:
+            with conn.begin():
                 # Add is_flagged column
                 if 'is_flagged' not in columns:
                     try:
@@ -545,7 +1143,7 @@ class AzureProductionMigration:
                         """))
                         logger.info("✓ Added 'is_flagged' column")
                     except Exception as e:
-                        logger.warning(f"Could not add 'is_flagged' column: {e}")
+                        logger.warning("Could not add 'is_flagged' column: %s", e)
                 
                 # Add flag_comment column
                 if 'flag_comment' not in columns:
@@ -556,7 +1154,7 @@ class AzureProductionMigration:
                         """))
                         logger.info("✓ Added 'flag_comment' column")
                     except Exception as e:
-                        logger.warning(f"Could not add 'flag_comment' column: {e}")
+                        logger.warning("Could not add 'flag_comment' column: %s", e)
                 
                 # Add flagged_by column
                 if 'flagged_by' not in columns:
@@ -567,7 +1165,7 @@ class AzureProductionMigration:
                         """))
                         logger.info("✓ Added 'flagged_by' column")
                     except Exception as e:
-                        logger.warning(f"Could not add 'flagged_by' column: {e}")
+                        logger.warning("Could not add 'flagged_by' column: %s", e)
                 
                 # Add flagged_at column
                 if 'flagged_at' not in columns:
@@ -578,7 +1176,7 @@ class AzureProductionMigration:
                         """))
                         logger.info("✓ Added 'flagged_at' column")
                     except Exception as e:
-                        logger.warning(f"Could not add 'flagged_at' column: {e}")
+                        logger.warning("Could not add 'flagged_at' column: %s", e)
                 
                 # Add flag_resolved column
                 if 'flag_resolved' not in columns:
@@ -589,7 +1187,7 @@ class AzureProductionMigration:
                         """))
                         logger.info("✓ Added 'flag_resolved' column")
                     except Exception as e:
-                        logger.warning(f"Could not add 'flag_resolved' column: {e}")
+                        logger.warning("Could not add 'flag_resolved' column: %s", e)
                 
                 # Add flag_resolved_at column
                 if 'flag_resolved_at' not in columns:
@@ -600,7 +1198,7 @@ class AzureProductionMigration:
                         """))
                         logger.info("✓ Added 'flag_resolved_at' column")
                     except Exception as e:
-                        logger.warning(f"Could not add 'flag_resolved_at' column: {e}")
+                        logger.warning("Could not add 'flag_resolved_at' column: %s", e)
                 
                 # Add flag_resolved_by column
                 if 'flag_resolved_by' not in columns:
@@ -611,40 +1209,35 @@ class AzureProductionMigration:
                         """))
                         logger.info("✓ Added 'flag_resolved_by' column")
                     except Exception as e:
-                        logger.warning(f"Could not add 'flag_resolved_by' column: {e}")
-                
-                conn.commit()
+                        logger.warning("Could not add 'flag_resolved_by' column: %s", e)
             
             # Verify columns were added
             inspector = inspect(db.engine)
-            updated_columns = [col['name'] for col in inspector.get_columns('task')]
+            updated_columns = frozenset(col['name'] for col in inspector.get_columns('task'))
             
-            added_columns = [col for col in new_columns if col in updated_columns]
+            added_columns = [col for col in columns_to_add if col in updated_columns]
             
             if len(added_columns) == len(columns_to_add):
-                logger.info(f"✓ Task flagging migration completed! Added {len(added_columns)} columns.")
+                logger.info("✓ Task flagging migration completed! Added %s columns.", len(added_columns))
                 self._log_step(f"Added task flagging columns: {added_columns}")
                 return True
             else:
-                logger.warning(f"Task flagging migration partially failed. Added {len(added_columns)}/{len(columns_to_add)} columns.")
+                logger.warning("Task flagging migration partially failed. Added %s/%s columns.", len(added_columns), len(columns_to_add))
                 self._log_step(f"Task flagging migration partially failed")
                 return False
                 
         except Exception as e:
-            logger.error(f"Task flagging migration failed: {str(e)}")
+            logger.error("Task flagging migration failed: %s", e)
             self._log_step(f"Task flagging migration failed: {str(e)}")
             return False
     
-    def _run_task_tracking_migration(self, db) -> bool:
+    def _run_task_tracking_migration(self, db, conn) -> bool:
         """Run task tracking migration to add tracking columns for conversational AI"""
         try:
             logger.info("Running task tracking migration...")
             
-            from sqlalchemy import inspect, text
-            
             # Check if the columns already exist
-            inspector = inspect(db.engine)
-            columns = [col['name'] for col in inspector.get_columns('task')]
+            columns = self._task_columns
             
             new_columns = [
                 'task_create_user',
@@ -655,13 +1248,6 @@ class AzureProductionMigration:
                 'task_delete_user',
                 'task_complete_user'
             ]
-            existing_columns = [col for col in new_columns if col in columns]
-            
-            if existing_columns:
-                logger.info(f"Task tracking columns already exist: {existing_columns}")
-                self._log_step(f"Task tracking columns already exist: {existing_columns}")
-                return True
-            
             columns_to_add = [col for col in new_columns if col not in columns]
             
             if not columns_to_add:
@@ -673,7 +1259,7 @@ class AzureProductionMigration:
             db_type = str(db.engine.dialect.name).lower()
             
             # Add the new columns
-            with db.engine.connect() as conn:
+            with conn.begin():
                 # Add task_create_user column
                 if 'task_create_user' not in columns:
                     try:
@@ -689,7 +1275,7 @@ class AzureProductionMigration:
                             """))
                         logger.info("✓ Added 'task_create_user' column")
                     except Exception as e:
-                        logger.warning(f"Could not add 'task_create_user' column: {e}")
+                        logger.warning("Could not add 'task_create_user' column: %s", e)
                 
                 # Add task_last_read_date column
                 if 'task_last_read_date' not in columns:
@@ -706,7 +1292,7 @@ class AzureProductionMigration:
                             """))
                         logger.info("✓ Added 'task_last_read_date' column")
                     except Exception as e:
-                        logger.warning(f"Could not add 'task_last_read_date' column: {e}")
+                        logger.warning("Could not add 'task_last_read_date' column: %s", e)
                 
                 # Add task_last_read_user column
                 if 'task_last_read_user' not in columns:
@@ -723,7 +1309,7 @@ class AzureProductionMigration:
                             """))
                         logger.info("✓ Added 'task_last_read_user' column")
                     except Exception as e:
-                        logger.warning(f"Could not add 'task_last_read_user' column: {e}")
+                        logger.warning("Could not add 'task_last_read_user' column: %s", e)
                 
                 # Add task_last_update_user column
                 if 'task_last_update_user' not in columns:
@@ -740,7 +1326,7 @@ class AzureProductionMigration:
                             """))
                         logger.info("✓ Added 'task_last_update_user' column")
                     except Exception as e:
-                        logger.warning(f"Could not add 'task_last_update_user' column: {e}")
+                        logger.warning("Could not add 'task_last_update_user' column: %s", e)
                 
                 # Add task_delete_date column
                 if 'task_delete_date' not in columns:
@@ -757,7 +1343,7 @@ class AzureProductionMigration:
                             """))
                         logger.info("✓ Added 'task_delete_date' column")
                     except Exception as e:
-                        logger.warning(f"Could not add 'task_delete_date' column: {e}")
+                        logger.warning("Could not add 'task_delete_date' column: %s", e)
                 
                 # Add task_delete_user column
                 if 'task_delete_user' not in columns:
@@ -774,7 +1360,7 @@ class AzureProductionMigration:
                             """))
                         logger.info("✓ Added 'task_delete_user' column")
                     except Exception as e:
-                        logger.warning(f"Could not add 'task_delete_user' column: {e}")
+                        logger.warning("Could not add 'task_delete_user' column: %s", e)
                 
                 # Add task_complete_user column
                 if 'task_complete_user' not in columns:
@@ -791,7 +1377,7 @@ class AzureProductionMigration:
                             """))
                         logger.info("✓ Added 'task_complete_user' column")
                     except Exception as e:
-                        logger.warning(f"Could not add 'task_complete_user' column: {e}")
+                        logger.warning("Could not add 'task_complete_user' column: %s", e)
                 
                 # Backfill existing tasks with reasonable defaults
                 try:
@@ -823,41 +1409,40 @@ class AzureProductionMigration:
                     """))
                     logger.info("✓ Backfilled task_last_update_user for updated tasks")
                 except Exception as e:
-                    logger.warning(f"Could not backfill task tracking data: {e}")
-                
-                conn.commit()
+                    logger.warning("Could not backfill task tracking data: %s", e)
+                    self._had_failures = True
             
             # Verify columns were added
             inspector = inspect(db.engine)
-            updated_columns = [col['name'] for col in inspector.get_columns('task')]
+            updated_columns = frozenset(col['name'] for col in inspector.get_columns('task'))
             
-            added_columns = [col for col in new_columns if col in updated_columns]
+            added_columns = [col for col in columns_to_add if col in updated_columns]
             
             if len(added_columns) == len(columns_to_add):
-                logger.info(f"✓ Task tracking migration completed! Added {len(added_columns)} columns.")
+                logger.info("✓ Task tracking migration completed! Added %s columns.", len(added_columns))
                 self._log_step(f"Added task tracking columns: {added_columns}")
                 
                 # Add indexes for performance
-                self._add_task_tracking_indexes(db.engine)
+                self._add_task_tracking_indexes(conn)
                 
                 return True
             else:
-                logger.warning(f"Task tracking migration partially failed. Added {len(added_columns)}/{len(columns_to_add)} columns.")
+                logger.warning("Task tracking migration partially failed. Added %s/%s columns.", len(added_columns), len(columns_to_add))
                 self._log_step(f"Task tracking migration partially failed")
                 return False
                 
         except Exception as e:
-            logger.error(f"Task tracking migration failed: {str(e)}")
+            logger.error("Task tracking migration failed: %s", e)
             self._log_step(f"Task tracking migration failed: {str(e)}")
             return False
     
-    def _add_task_tracking_indexes(self, engine):
+    def _add_task_tracking_indexes(self, conn):
         """Add database indexes for task tracking queries"""
         try:
-            from sqlalchemy import text
+            index_options = self._index_with_clause(conn)
             
             # Index for task tracking lookups
-            with engine.connect() as conn:
+            with conn.begin():
                 indexes_to_create = [
                     ('idx_task_create_user', 'task_create_user'),
                     ('idx_task_last_read_user', 'task_last_read_user'),
@@ -870,65 +1455,76 @@ class AzureProductionMigration:
                     try:
                         conn.execute(text(f"""
                             CREATE INDEX {index_name} 
-                            ON task({column_name})
+                            ON task({column_name}){index_options}
                         """))
-                        logger.info(f"✓ Added index for {column_name}")
+                        logger.info("✓ Added index for %s", column_name)
                     except Exception as e:
                         if "already exists" not in str(e).lower() and "duplicate" not in str(e).lower():
-                            logger.warning(f"Could not create {index_name}: {e}")
-                
-                conn.commit()
+                            logger.warning("Could not create %s: %s", index_name, e)
+                            self._had_failures = True
             
             logger.info("✓ Task tracking indexes created successfully")
             
         except Exception as e:
-            logger.warning(f"Some task tracking indexes may not have been created: {str(e)}")
+            logger.warning("Some task tracking indexes may not have been created: %s", e)
+            self._had_failures = True
     
-    def _create_indexes(self, engine) -> bool:
+    def _create_indexes(self, conn) -> bool:
         """Create optimized indexes for Azure database"""
         try:
             logger.info("Creating database indexes...")
             
             # Create basic indexes directly instead of using missing azure_database_config
             try:
-                from sqlalchemy import text
-                
-                with engine.connect() as conn:
-                    # Create basic indexes for sharing tables (SQL Server doesn't support IF NOT EXISTS)
-                    indexes_to_create = [
-                        "CREATE INDEX idx_project_collaborators_project_id ON project_collaborators(project_id)",
-                        "CREATE INDEX idx_project_collaborators_user_id ON project_collaborators(user_id)",
-                        "CREATE INDEX idx_sharing_tokens_project_id ON sharing_tokens(project_id)",
-                        "CREATE INDEX idx_sharing_tokens_token ON sharing_tokens(token)",
-                        "CREATE INDEX idx_sharing_activity_log_project_id ON sharing_activity_log(project_id)",
-                        "CREATE INDEX idx_sharing_activity_log_created_at ON sharing_activity_log(created_at)",
-                        "CREATE INDEX idx_task_is_flagged ON task(is_flagged)",
-                        "CREATE INDEX idx_task_flagged_by ON task(flagged_by)",
-                        "CREATE INDEX idx_task_flag_resolved ON task(flag_resolved)"
-                    ]
+                index_options = self._index_with_clause(conn)
+                create_index = "CREATE INDEX " if self._is_mssql else "CREATE INDEX IF NOT EXISTS "
+                
+                with conn.begin():
+                    indexes_to_create = tuple(create_index + index for index in _BASIC_INDEXES) + (
+                        _SHARING_ACTIVITY_COVERING_INDEX.get(
+                            self._dialect, _SHARING_ACTIVITY_COVERING_INDEX_DEFAULT
+                        ),
+                    )
+                    if not self._is_mssql:
+                        indexes_to_create += (_USER_EMAIL_LOWER_INDEX,)
                     
                     created_count = 0
                     for index_sql in indexes_to_create:
-                        try:
-                            conn.execute(text(index_sql))
+                        if self._create_index(conn, index_sql + index_options):
                             created_count += 1
-                        except Exception as e:
-                            if "already exists" not in str(e).lower():
-                                logger.warning(f"Failed to create index: {e}")
-                    
-                    conn.commit()
                 
-                logger.info(f"✓ Created {created_count} database indexes")
+                logger.info("✓ Created %s database indexes", created_count)
                 self._log_step(f"Created {created_count} indexes")
                 
             except Exception as e:
-                logger.warning(f"Index creation had issues: {e}")
+                logger.warning("Index creation had issues: %s", e)
+                self._had_failures = True
             
             # Index creation errors are not fatal for migration
             return True
             
         except Exception as e:
-            logger.error(f"Index creation failed: {e}")
+            logger.error("Index creation failed: %s", e)
+            return False
+    
+    def _create_index(self, conn, index_sql: str) -> bool:
+        """
+        Run one CREATE INDEX inside the caller's transaction
+        
+        On PostgreSQL a failed statement aborts the whole transaction, so each
+        index gets its own savepoint and a failure only skips that index.
+        """
+        try:
+            if self._is_postgres:
+                with conn.begin_nested():
+                    conn.execute(text(index_sql))
+            else:
+                conn.execute(text(index_sql))
+            return True
+        except Exception as e:
+            if "already exists" not in str(e).lower():
+                logger.warning("Failed to create index: %s", e)
+                self._had_failures = True
             return False
     
     def _create_backup_procedures(self, engine) -> bool:
@@ -943,7 +1539,7 @@ class AzureProductionMigration:
             return True
             
         except Exception as e:
-            logger.error(f"Backup procedure creation failed: {e}")
+            logger.error("Backup procedure creation failed: %s", e)
             return False
     
     def _optimize_database_settings(self, engine) -> bool:
@@ -951,11 +1547,9 @@ class AzureProductionMigration:
         try:
             logger.info("Applying database optimizations...")
             
-            database_url = str(engine.url)
-            
-            if 'mssql' in database_url or 'sqlserver' in database_url:
+            if self._is_mssql:
                 self._optimize_azure_sql(engine)
-            elif 'postgresql' in database_url:
+            elif self._is_postgres:
                 self._optimize_azure_postgres(engine)
             else:
                 logger.info("No specific optimizations for this database type")
@@ -964,51 +1558,65 @@ class AzureProductionMigration:
             return True
             
         except Exception as e:
-            logger.warning(f"Database optimization warning: {e}")
+            logger.warning("Database optimization warning: %s", e)
+            self._had_failures = True
             # Optimizations are not critical for migration success
             return True
     
     def _optimize_azure_sql(self, engine):
         """Apply Azure SQL Database specific optimizations"""
         try:
+            # Update stale statistics for better query performance
             with engine.connect() as conn:
-                # Update statistics for better query performance
-                tables_to_optimize = [
-                    'project_collaborators', 'sharing_tokens', 'sharing_activity_log', 
-                    'active_sessions', 'task', 'project', '[user]', 'label', 'task_labels',
-                    'task_dependency', 'invitation_notifications'
-                ]
-                
-                for table in tables_to_optimize:
-                    try:
-                        conn.execute(db.text(f"UPDATE STATISTICS {table}"))
-                        logger.info(f"✓ Updated statistics for {table}")
-                    except Exception as e:
-                        logger.warning(f"Could not update statistics for {table}: {e}")
-                
+                stale_statistics = conn.execute(_SQL_STALE_STATISTICS).fetchall()
+            
+            if stale_statistics:
+                with ThreadPoolExecutor(max_workers=_STATISTICS_MAX_WORKERS) as executor:
+                    list(executor.map(
+                        lambda row: self._update_table_statistics(engine, row.table_name, row.stats_name),
+                        stale_statistics
+                    ))
+            else:
+                logger.info("✓ Table statistics are up to date")
+            
+            # ALTER DATABASE is not allowed inside a user transaction, so these
+            # run in autocommit mode. They are optional tuning: a failure (usually
+            # a missing ALTER DATABASE permission) is logged but does not keep
+            # the migration version from being recorded
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
                 # Set Azure SQL Database specific optimizations
                 try:
                     # Enable query store for performance monitoring
-                    conn.execute(db.text("""
-                        ALTER DATABASE CURRENT SET QUERY_STORE = ON
-                    """))
+                    conn.execute(_SQL_ENABLE_QUERY_STORE)
                     logger.info("✓ Enabled Query Store for performance monitoring")
                 except Exception as e:
-                    logger.warning(f"Could not enable Query Store: {e}")
+                    logger.warning("Could not enable Query Store: %s", e)
                 
                 # Set compatibility level for better performance
                 try:
-                    conn.execute(db.text("""
-                        ALTER DATABASE CURRENT SET COMPATIBILITY_LEVEL = 160
-                    """))
+                    conn.execute(_SQL_SET_COMPATIBILITY_LEVEL)
                     logger.info("✓ Set compatibility level to SQL Server 2022")
                 except Exception as e:
-                    logger.warning(f"Could not set compatibility level: {e}")
+                    logger.warning("Could not set compatibility level: %s", e)
                 
                 logger.info("✓ Azure SQL Database optimizations completed")
                 
         except Exception as e:
-            logger.warning(f"Azure SQL optimization warning: {e}")
+            logger.warning("Azure SQL optimization warning: %s", e)
+            self._had_failures = True
+    
+    def _update_table_statistics(self, engine, table: str, stats_name: str):
+        """Update a single statistics object on its own connection"""
+        try:
+            with engine.connect() as conn:
+                conn.execute(text(
+                    f"UPDATE STATISTICS [{table}] ([{stats_name}]) WITH SAMPLE 10 PERCENT"
+                ))
+                conn.commit()
+            logger.info("✓ Updated statistics %s for %s", stats_name, table)
+        except Exception as e:
+            logger.warning("Could not update statistics %s for %s: %s", stats_name, table, e)
+            self._had_failures = True
     
     def _optimize_azure_postgres(self, engine):
         """Apply Azure Database for PostgreSQL specific optimizations"""
@@ -1023,182 +1631,138 @@ class AzureProductionMigration:
                 logger.info("✓ Analyzed PostgreSQL tables")
                 
         except Exception as e:
-            logger.warning(f"Azure PostgreSQL optimization warning: {e}")
+            logger.warning("Azure PostgreSQL optimization warning: %s", e)
+            self._had_failures = True
     
-    def _create_monitoring_views(self, engine) -> bool:
+    def _create_monitoring_views(self, conn) -> bool:
         """Create database views for monitoring sharing functionality"""
         try:
             logger.info("Creating monitoring views...")
             
-            database_url = str(engine.url)
             views_created = 0
+            views_to_create = _MONITORING_VIEWS.get(self._dialect, _SQLITE_MONITORING_VIEWS)
+            
+            if self._is_mssql or self._is_postgres:
+                # The views are independent, so build each on its own pooled
+                # connection and transaction
+                with ThreadPoolExecutor(max_workers=len(views_to_create)) as executor:
+                    views_created = sum(executor.map(
+                        lambda view: self._create_view(conn.engine, *view),
+                        views_to_create
+                    ))
+            else:
+                # SQLite serializes writers, so keep the shared connection
+                with conn.begin():
+                    for view_name, view_sql in views_to_create:
+                        try:
+                            conn.execute(view_sql)
+                            views_created += 1
+                            logger.info("✓ Created monitoring view: %s", view_name)
+                        except Exception as e:
+                            logger.warning("Failed to create view %s: %s", view_name, e)
+                            self._had_failures = True
             
-            with engine.connect() as conn:
-                if 'mssql' in database_url or 'sqlserver' in database_url:
-                    # SQL Server monitoring views
-                    
-                    # Active collaborations view
-                    active_collaborations_view = db.text("""
-                        CREATE OR ALTER VIEW v_active_collaborations AS
-                        SELECT 
-                            pc.project_id,
-                            p.name as project_name,
-                            pc.user_id,
-                            u.name as user_name,
-                            u.email as user_email,
-                            pc.role,
-                            pc.status,
-                            pc.invited_at,
-                            pc.accepted_at,
-                            DATEDIFF(day, pc.invited_at, GETUTCDATE()) as days_since_invitation
-                        FROM project_collaborators pc
-                        JOIN project p ON pc.project_id = p.id
-                        JOIN [user] u ON pc.user_id = u.id
-                        WHERE pc.status = 'accepted'
-                    """)
-                    
-                    # Sharing activity summary view
-                    sharing_activity_view = db.text("""
-                        CREATE OR ALTER VIEW v_sharing_activity_summary AS
-                        SELECT 
-                            project_id,
-                            action,
-                            COUNT(*) as activity_count,
-                            MAX(created_at) as last_activity,
-                            COUNT(DISTINCT user_id) as unique_users,
-                            COUNT(DISTINCT ip_address) as unique_ips
-                        FROM sharing_activity_log
-                        WHERE created_at >= DATEADD(day, -30, GETUTCDATE())
-                        GROUP BY project_id, action
-                    """)
-                    
-                    views_to_create = [
-                        ('v_active_collaborations', active_collaborations_view),
-                        ('v_sharing_activity_summary', sharing_activity_view)
-                    ]
-                    
-                elif 'postgresql' in database_url:
-                    # PostgreSQL monitoring views
-                    
-                    active_collaborations_view = db.text("""
-                        CREATE OR REPLACE VIEW v_active_collaborations AS
-                        SELECT 
-                            pc.project_id,
-                            p.name as project_name,
-                            pc.user_id,
-                            u.name as user_name,
-                            u.email as user_email,
-                            pc.role,
-                            pc.status,
-                            pc.invited_at,
-                            pc.accepted_at,
-                            EXTRACT(days FROM (NOW() AT TIME ZONE 'UTC' - pc.invited_at)) as days_since_invitation
-                        FROM project_collaborators pc
-                        JOIN project p ON pc.project_id = p.id
-                        JOIN "user" u ON pc.user_id = u.id
-                        WHERE pc.status = 'accepted'
-                    """)
-                    
-                    sharing_activity_view = db.text("""
-                        CREATE OR REPLACE VIEW v_sharing_activity_summary AS
-                        SELECT 
-                            project_id,
-                            action,
-                            COUNT(*) as activity_count,
-                            MAX(created_at) as last_activity,
-                            COUNT(DISTINCT user_id) as unique_users,
-                            COUNT(DISTINCT ip_address) as unique_ips
-                        FROM sharing_activity_log
-                        WHERE created_at >= (NOW() AT TIME ZONE 'UTC' - INTERVAL '30 days')
-                        GROUP BY project_id, action
-                    """)
-                    
-                    views_to_create = [
-                        ('v_active_collaborations', active_collaborations_view),
-                        ('v_sharing_activity_summary', sharing_activity_view)
-                    ]
-                
-                else:
-                    # SQLite - create simple views
-                    active_collaborations_view = db.text("""
-                        CREATE VIEW IF NOT EXISTS v_active_collaborations AS
-                        SELECT 
-                            pc.project_id,
-                            p.name as project_name,
-                            pc.user_id,
-                            u.name as user_name,
-                            u.email as user_email,
-                            pc.role,
-                            pc.status,
-                            pc.invited_at,
-                            pc.accepted_at
-                        FROM project_collaborators pc
-                        JOIN project p ON pc.project_id = p.id
-                        JOIN user u ON pc.user_id = u.id
-                        WHERE pc.status = 'accepted'
-                    """)
-                    
-                    views_to_create = [
-                        ('v_active_collaborations', active_collaborations_view)
-                    ]
-                
-                # Create views
-                for view_name, view_sql in views_to_create:
-                    try:
-                        conn.execute(view_sql)
-                        views_created += 1
-                        logger.info(f"✓ Created monitoring view: {view_name}")
-                    except Exception as e:
-                        logger.warning(f"Failed to create view {view_name}: {e}")
-                
-                conn.commit()
-            
-            logger.info(f"✓ Created {views_created} monitoring views")
+            logger.info("✓ Created %s monitoring views", views_created)
             self._log_step(f"Created {views_created} monitoring views")
             
+            if self._is_postgres:
+                self._schedule_mv_refresh(conn)
+            
             return True
             
         except Exception as e:
-            logger.warning(f"Monitoring view creation warning: {e}")
+            logger.warning("Monitoring view creation warning: %s", e)
+            self._had_failures = True
             return True  # Not critical for migration
     
-    def _validate_migration(self, db) -> bool:
+    def _create_view(self, engine, view_name: str, view_sql) -> bool:
+        """Create a single monitoring view in its own transaction"""
+        try:
+            with engine.begin() as conn:
+                conn.execute(view_sql)
+            logger.info("✓ Created monitoring view: %s", view_name)
+            return True
+        except Exception as e:
+            logger.warning("Failed to create view %s: %s", view_name, e)
+            self._had_failures = True
+            return False
+    
+    def _schedule_mv_refresh(self, conn):
+        """Schedule concurrent refreshes of the materialized monitoring views via pg_cron"""
+        try:
+            with conn.begin():
+                if conn.execute(_SQL_PG_CRON_INSTALLED).first() is None:
+                    logger.warning("pg_cron is not installed - schedule materialized view refreshes externally")
+                    return
+                
+                for view_name in _PG_TRIGGER_MAINTAINED_VIEWS:
+                    conn.execute(_SQL_PG_CRON_UNSCHEDULE, {'job_name': f"refresh-{view_name}"})
+                
+                for view_name in _PG_MATERIALIZED_VIEWS:
+                    conn.execute(_SQL_PG_CRON_SCHEDULE, {
+                        'job_name': f"refresh-{view_name}",
+                        'schedule': _MATERIALIZED_VIEW_REFRESH_SCHEDULE,
+                        'command': f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view_name}",
+                    })
+            
+            logger.info("✓ Scheduled materialized view refreshes")
+            self._log_step("Scheduled materialized view refreshes")
+            
+        except Exception as e:
+            logger.warning("Could not schedule materialized view refreshes: %s", e)
+            self._had_failures = True
+    
+    def _validate_migration(self, db, conn) -> bool:
         """Validate that migration was successful"""
         try:
             logger.info("Validating migration...")
             
-            # Check table existence and basic structure
-            inspector = db.inspect(db.engine)
-            
             validation_checks = []
             
-            # Check project_collaborators table
-            if 'project_collaborators' in inspector.get_table_names():
-                columns = [col['name'] for col in inspector.get_columns('project_collaborators')]
-                required_columns = ['id', 'project_id', 'user_id', 'role', 'status']
-                if all(col in columns for col in required_columns):
-                    validation_checks.append("✓ project_collaborators table structure valid")
-                else:
-                    validation_checks.append("✗ project_collaborators table structure invalid")
-            
-            # Check sharing_tokens table
-            if 'sharing_tokens' in inspector.get_table_names():
-                columns = [col['name'] for col in inspector.get_columns('sharing_tokens')]
-                required_columns = ['id', 'token', 'project_id', 'expires_at', 'is_active']
-                if all(col in columns for col in required_columns):
-                    validation_checks.append("✓ sharing_tokens table structure valid")
+            # Fetch the columns of every validated table in one metadata query
+            # instead of one inspector round trip per table
+            if self._is_mssql or self._is_postgres:
+                with conn.begin():
+                    column_rows = conn.execute(
+                        _SQL_VALIDATION_COLUMNS, {'tables': list(_VALIDATION_REQUIRED_COLUMNS)}
+                    ).fetchall()
+                    index_count = conn.execute(
+                        _SQL_COUNT_INDEXES['postgresql' if self._is_postgres else 'mssql'],
+                        {'table': 'project_collaborators'}
+                    ).scalar()
+                
+                table_columns = {}
+                for table_name, column_name in column_rows:
+                    table_columns.setdefault(table_name, set()).add(column_name)
+            else:
+                inspector = db.inspect(db.engine)
+                existing_tables = frozenset(inspector.get_table_names())
+                table_columns = {
+                    table_name: {col['name'] for col in inspector.get_columns(table_name)}
+                    for table_name in _VALIDATION_REQUIRED_COLUMNS
+                    if table_name in existing_tables
+                }
+                try:
+                    index_count = len(inspector.get_indexes('project_collaborators'))
+                except Exception:
+                    index_count = None
+            
+            # Check table existence and basic structure
+            for table_name, required_columns in _VALIDATION_REQUIRED_COLUMNS.items():
+                if table_name not in table_columns:
+                    continue
+                if table_columns[table_name].issuperset(required_columns):
+                    validation_checks.append(f"✓ {table_name} table structure valid")
                 else:
-                    validation_checks.append("✗ sharing_tokens table structure invalid")
+                    validation_checks.append(f"✗ {table_name} table structure invalid")
             
             # Check indexes
-            try:
-                indexes = inspector.get_indexes('project_collaborators')
-                if len(indexes) > 0:
-                    validation_checks.append(f"✓ Found {len(indexes)} indexes on project_collaborators")
-                else:
-                    validation_checks.append("⚠ No indexes found on project_collaborators")
-            except:
+            if index_count is None:
                 validation_checks.append("⚠ Could not check indexes")
+            elif index_count > 0:
+                validation_checks.append(f"✓ Found {index_count} indexes on project_collaborators")
+            else:
+                validation_checks.append("⚠ No indexes found on project_collaborators")
             
             # Log validation results
             for check in validation_checks:
@@ -1208,7 +1772,7 @@ class AzureProductionMigration:
             failed_checks = [check for check in validation_checks if check.startswith("✗")]
             
             if failed_checks:
-                logger.error(f"Migration validation failed: {len(failed_checks)} critical issues")
+                logger.error("Migration validation failed: %s critical issues", len(failed_checks))
                 return False
             
             logger.info("✓ Migration validation passed")
@@ -1217,60 +1781,58 @@ class AzureProductionMigration:
             return True
             
         except Exception as e:
-            logger.error(f"Migration validation failed: {e}")
+            logger.error("Migration validation failed: %s", e)
             return False
     
     def _log_step(self, message: str):
         """Log migration step with timestamp"""
-        timestamp = datetime.utcnow().isoformat()
-        log_entry = f"[{timestamp}] {message}"
-        self.migration_log.append(log_entry)
+        self.migration_log.append((time.monotonic_ns() - self._started_ns, message))
+    
+    def _iter_report(self):
+        """Yield the migration report line by line"""
+        yield "# Azure Production Migration Report"
+        yield f"Generated: {datetime.utcnow().isoformat()}"
+        yield ""
+        yield "## Migration Steps"
+        yield ""
+        
+        for elapsed_ns, message in self.migration_log:
+            timestamp = (self._started_at + timedelta(microseconds=elapsed_ns // 1000)).isoformat()
+            yield f"- [{timestamp}] {message}"
+        
+        yield from (
+            "",
+            "## Database Configuration",
+            "- Connection pooling: Enabled",
+            "- Indexes: Created for sharing tables",
+            "- Monitoring views: Created",
+            "- Cleanup procedures: Created (if supported)",
+            "",
+            "## Next Steps",
+            "1. Monitor database performance using created views",
+            "2. Set up automated cleanup job for expired tokens",
+            "3. Configure backup retention policies",
+            "4. Monitor sharing activity logs for security",
+        )
     
     def _generate_migration_report(self):
         """Generate and save migration report"""
         try:
-            report_content = [
-                "# Azure Production Migration Report",
-                f"Generated: {datetime.utcnow().isoformat()}",
-                "",
-                "## Migration Steps",
-                ""
-            ]
-            
-            for log_entry in self.migration_log:
-                report_content.append(f"- {log_entry}")
-            
-            report_content.extend([
-                "",
-                "## Database Configuration",
-                "- Connection pooling: Enabled",
-                "- Indexes: Created for sharing tables",
-                "- Monitoring views: Created",
-                "- Cleanup procedures: Created (if supported)",
-                "",
-                "## Next Steps",
-                "1. Monitor database performance using created views",
-                "2. Set up automated cleanup job for expired tokens",
-                "3. Configure backup retention policies",
-                "4. Monitor sharing activity logs for security",
-                ""
-            ])
-            
-            # Save report
+            # Save report, streaming lines instead of joining them in memory
             report_path = "azure_migration_report.md"
             with open(report_path, 'w') as f:
-                f.write('\n'.join(report_content))
+                f.writelines(line + '\n' for line in self._iter_report())
             
-            logger.info(f"✓ Migration report saved to {report_path}")
+            logger.info("✓ Migration report saved to %s", report_path)
             
         except Exception as e:
-            logger.warning(f"Could not generate migration report: {e}")
+            logger.warning("Could not generate migration report: %s", e)
 
 
-def run_production_migration():
+def run_production_migration(force=False):
     """Run the production migration"""
     migration = AzureProductionMigration()
-    return migration.run_production_migration()
+    return migration.run_production_migration(force=force)
 
 
 def main():
@@ -1280,6 +1842,7 @@ def main():
     parser = argparse.ArgumentParser(description='Azure Production Database Migration')
     parser.add_argument('--dry-run', action='store_true', help='Perform a dry run without making changes')
     parser.add_argument('--verbose', action='store_true', help='Enable verbose logging')
+    parser.add_argument('--force', action='store_true', help='Re-run even if this migration version is recorded')
     
     args = parser.parse_args()
     
@@ -1291,7 +1854,7 @@ def main():
         # TODO: Implement dry run logic
         return True
     
-    success = run_production_migration()
+    success = run_production_migration(force=args.force)
     
     if success:
         logger.info("🎉 Production migration completed successfully!")
@@ -1,10 +1,332 @@
 import os
 import json
 import time
+import atexit
+import functools
+import hashlib
+import heapq
+import random
+import re
+from collections import Counter
 from datetime import datetime, timedelta
-from openai import OpenAI
-from typing import Dict, List, Optional
+from openai import OpenAI, APIStatusError, RateLimitError
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
 import httpx
+
+# One keep-alive pool per process, so repeated AIAssistant() construction
+# reuses the TLS connection to the API instead of handshaking every time.
+# Created without proxy settings to avoid conflicts: the OpenAI library
+# otherwise tries to pass proxy settings that this httpx version rejects
+_HTTP_CLIENT = httpx.Client(
+    timeout=httpx.Timeout(60.0, connect=5.0),
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+)
+atexit.register(_HTTP_CLIENT.close)
+
+# Static instructions go in the system message and per-request data goes
+# last, so every call shares the same prompt prefix and hits the API's
+# prompt cache
+BRIEF_SYSTEM_PROMPT = """You are an expert project manager and business strategist who creates comprehensive, actionable project briefs. Always respond with valid JSON.
+
+Based on the project name and user input in the next message, create a comprehensive project brief.
+
+Please provide a structured project brief with the following sections:
+1. Vision: A clear, inspiring vision statement for the project
+2. Problems: The specific problems this project aims to solve
+3. Timeline: Suggested timeline with key phases
+4. Impact: Expected business impact and outcomes
+5. Goals: Specific, measurable goals for the project
+
+Format your response as a JSON object with these exact keys: vision, problems, timeline, impact, goals
+Each value should be a well-written paragraph (2-4 sentences)."""
+
+PLAN_SYSTEM_PROMPT = """You are an expert project manager who creates practical, actionable project plans. Always respond with valid JSON.
+
+Based on the project brief in the next message, create a starter project plan with 5-8 high-level tasks that would be needed to execute this project.
+
+For each task, provide:
+- title: A clear, actionable task title
+- description: A detailed description of what needs to be done
+- priority: high, medium, or low
+- size: small, medium, or large
+- estimated_duration: Number of days (1-30)
+- suggested_start_offset: Days from project start (0-30)
+
+Format your response as a JSON object with a single key "tasks" whose value is an array of objects with these exact keys: title, description, priority, size, estimated_duration, suggested_start_offset"""
+
+SUMMARY_SYSTEM_PROMPT = """You are an expert project manager who creates clear, actionable project summaries.
+
+Create a concise, professional project summary from the project brief and current tasks in the next message.
+
+Provide a 2-3 paragraph summary that includes:
+1. Project overview and objectives
+2. Current status and key activities
+3. Next steps and priorities
+
+Keep it professional and actionable."""
+
+# Per-request user messages, formatted onto flush-left templates so no
+# source indentation ends up in the billed prompt
+BRIEF_INPUT_TEMPLATE = """Project name: "{project_name}"
+
+User Input: {user_input}"""
+
+PLAN_INPUT_TEMPLATE = """Project: {project_name}
+Vision: {vision}
+Problems: {problems}
+Timeline: {timeline}
+Impact: {impact}
+Goals: {goals}"""
+
+SUMMARY_INPUT_TEMPLATE = """Project: "{project_name}"
+
+Project Brief:
+Vision: {vision}
+Goals: {goals}
+
+Current Tasks:
+{tasks_summary}"""
+
+# Model responses keyed by a hash of the model and prompts, so repeating the
+# same input within the TTL skips the API round-trip
+RESPONSE_CACHE_TTL = 3600  # seconds
+RESPONSE_CACHE_MAX_ENTRIES = 1024
+_response_cache: Dict[str, Tuple[float, str]] = {}
+
+def _response_cache_key(model: str, system_prompt: str, prompt: str) -> str:
+    return hashlib.blake2b(
+        f"{model}|{system_prompt}|{prompt}".encode(), digest_size=16
+    ).hexdigest()
+
+def _cached_response(key: str) -> Optional[str]:
+    cached = _response_cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    return None
+
+def _cache_response(key: str, content: str):
+    if key not in _response_cache and len(_response_cache) >= RESPONSE_CACHE_MAX_ENTRIES:
+        # Dicts keep insertion order, so the first key is the oldest entry
+        _response_cache.pop(next(iter(_response_cache)), None)
+    _response_cache[key] = (time.monotonic() + RESPONSE_CACHE_TTL, content)
+
+# Retries are driven here rather than inside the SDK so there is one policy:
+# the server's Retry-After when given, otherwise full-jitter exponential backoff
+MAX_RETRIES = 5
+RETRY_BASE_DELAY = 0.5  # seconds
+RETRY_MAX_DELAY = 60.0  # seconds
+
+def _retry_delay(attempt: int, error: Exception) -> float:
+    """Seconds to wait before retrying after the given failed attempt"""
+    response = getattr(error, 'response', None)
+    if response is not None:
+        headers = response.headers
+        try:
+            if headers.get('retry-after-ms'):
+                return min(float(headers['retry-after-ms']) / 1000, RETRY_MAX_DELAY)
+            if headers.get('retry-after'):
+                return min(float(headers['retry-after']), RETRY_MAX_DELAY)
+        except ValueError:
+            pass  # HTTP-date Retry-After values fall back to backoff
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+def _is_retryable(error: Exception) -> bool:
+    """Client errors other than rate limits fail the same way on every retry"""
+    if isinstance(error, RateLimitError):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code >= 500 or error.status_code in (408, 409)
+    return True
+
+# Long projects list only the most relevant tasks in the summary prompt:
+# active work first, then committed, completed and backlog
+SUMMARY_MAX_TASKS = 40
+_SUMMARY_STATUS_RANK = {'in_progress': 0, 'blocked': 0, 'committed': 1, 'completed': 2}
+_SUMMARY_DEFAULT_RANK = 3
+
+def _summary_relevance(task: Dict) -> int:
+    return _SUMMARY_STATUS_RANK.get(task.get('status'), _SUMMARY_DEFAULT_RANK)
+
+# Keywords the fallbacks use to classify a project, matched against the
+# input's words in one set intersection rather than a substring scan each
+_WORD_RE = re.compile(r"[a-z]+")
+_DIGITAL_KEYWORDS = frozenset({'website', 'websites', 'web', 'app', 'apps', 'application', 'applications'})
+_MARKETING_KEYWORDS = frozenset({'marketing', 'campaign', 'campaigns', 'brand', 'branding'})
+_PROCESS_KEYWORDS = frozenset({'process', 'processes', 'workflow', 'workflows', 'system', 'systems'})
+
+def _words(text: str) -> frozenset:
+    return frozenset(_WORD_RE.findall(text.lower()))
+
+# Fallback plans per project type; {project_name} in a title is filled in per call
+_DIGITAL_FALLBACK_TASKS = (
+    {
+        'title': 'Project Planning for {project_name}',
+        'description': 'Define project scope, technical requirements, and development timeline',
+        'priority': 'high',
+        'size': 'medium',
+        'estimated_duration': 3,
+        'suggested_start_offset': 0
+    },
+    {
+        'title': 'Technical Architecture Design',
+        'description': 'Design system architecture, database schema, and technical specifications',
+        'priority': 'high',
+        'size': 'medium',
+        'estimated_duration': 5,
+        'suggested_start_offset': 3
+    },
+    {
+        'title': 'Development and Implementation',
+        'description': 'Build core functionality and features according to specifications',
+        'priority': 'high',
+        'size': 'large',
+        'estimated_duration': 15,
+        'suggested_start_offset': 8
+    },
+    {
+        'title': 'Testing and Quality Assurance',
+        'description': 'Perform comprehensive testing including unit, integration, and user acceptance testing',
+        'priority': 'high',
+        'size': 'medium',
+        'estimated_duration': 5,
+        'suggested_start_offset': 23
+    },
+    {
+        'title': 'Deployment and Launch',
+        'description': 'Deploy to production environment and conduct final launch activities',
+        'priority': 'high',
+        'size': 'small',
+        'estimated_duration': 3,
+        'suggested_start_offset': 28
+    }
+)
+
+_MARKETING_FALLBACK_TASKS = (
+    {
+        'title': 'Strategy Development for {project_name}',
+        'description': 'Develop marketing strategy, target audience analysis, and campaign objectives',
+        'priority': 'high',
+        'size': 'medium',
+        'estimated_duration': 4,
+        'suggested_start_offset': 0
+    },
+    {
+        'title': 'Creative Development',
+        'description': 'Create marketing materials, content, and creative assets',
+        'priority': 'high',
+        'size': 'medium',
+        'estimated_duration': 6,
+        'suggested_start_offset': 4
+    },
+    {
+        'title': 'Campaign Implementation',
+        'description': 'Execute marketing campaigns across selected channels and platforms',
+        'priority': 'high',
+        'size': 'large',
+        'estimated_duration': 8,
+        'suggested_start_offset': 10
+    },
+    {
+        'title': 'Performance Monitoring',
+        'description': 'Track campaign performance, analyze metrics, and optimize results',
+        'priority': 'medium',
+        'size': 'medium',
+        'estimated_duration': 4,
+        'suggested_start_offset': 18
+    },
+    {
+        'title': 'Campaign Analysis and Reporting',
+        'description': 'Compile results, insights, and recommendations for future campaigns',
+        'priority': 'medium',
+        'size': 'small',
+        'estimated_duration': 2,
+        'suggested_start_offset': 22
+    }
+)
+
+_GENERAL_FALLBACK_TASKS = (
+    {
+        'title': 'Project Planning for {project_name}',
+        'description': 'Define project scope, timeline, resources, and success criteria',
+        'priority': 'high',
+        'size': 'medium',
+        'estimated_duration': 3,
+        'suggested_start_offset': 0
+    },
+    {
+        'title': 'Requirements Analysis',
+        'description': 'Gather and document detailed project requirements and specifications',
+        'priority': 'high',
+        'size': 'medium',
+        'estimated_duration': 5,
+        'suggested_start_offset': 3
+    },
+    {
+        'title': 'Project Execution',
+        'description': 'Implement core project deliverables and manage day-to-day activities',
+        'priority': 'high',
+        'size': 'large',
+        'estimated_duration': 12,
+        'suggested_start_offset': 8
+    },
+    {
+        'title': 'Quality Control and Testing',
+        'description': 'Review deliverables, conduct quality checks, and validate outcomes',
+        'priority': 'medium',
+        'size': 'medium',
+        'estimated_duration': 4,
+        'suggested_start_offset': 20
+    },
+    {
+        'title': 'Project Closure and Handover',
+        'description': 'Finalize deliverables, conduct project review, and transfer ownership',
+        'priority': 'high',
+        'size': 'small',
+        'estimated_duration': 2,
+        'suggested_start_offset': 24
+    }
+)
+
+def _materialize_tasks(template: tuple, project_name: str) -> List[Dict[str, str]]:
+    return [{**task, 'title': task['title'].format(project_name=project_name)} for task in template]
+
+T = TypeVar('T')
+
+# Output token ceilings per model, a little above typical reply lengths; a
+# JSON reply cut off at the ceiling is unusable, so they keep some headroom.
+# gpt-4o's tokenizer needs fewer tokens for the same text than older models
+_MAX_TOKENS = {
+    'gpt-4o': {'brief': 600, 'plan': 1200, 'summary': 400},
+    'gpt-4o-mini': {'brief': 600, 'plan': 1200, 'summary': 400},
+    'gpt-4': {'brief': 700, 'plan': 1350, 'summary': 450},
+    'gpt-4-turbo': {'brief': 700, 'plan': 1350, 'summary': 450},
+    'gpt-3.5-turbo': {'brief': 700, 'plan': 1350, 'summary': 450},
+}
+_DEFAULT_MAX_TOKENS = {'brief': 1000, 'plan': 1500, 'summary': 500}
+
+# Inputs shorter than this, or without a single letter or digit, give the
+# model nothing to work with, so they go straight to the fallbacks
+MIN_AI_INPUT_CHARS = 20
+_SIGNAL_RE = re.compile(r"[^\W_]")
+
+def _has_signal(text: str) -> bool:
+    text = text.strip()
+    return len(text) >= MIN_AI_INPUT_CHARS and _SIGNAL_RE.search(text) is not None
+
+def _parse_brief(content: str) -> Dict[str, str]:
+    brief = json.loads(content)
+    if not isinstance(brief, dict):
+        raise ValueError("brief is not a JSON object")
+    return brief
+
+def _parse_plan(content: str) -> List[Dict[str, str]]:
+    plan = json.loads(content)
+    tasks = plan.get('tasks') if isinstance(plan, dict) else None
+    if not isinstance(tasks, list):
+        # JSON mode guarantees valid JSON, not the requested shape
+        raise ValueError("plan has no 'tasks' list")
+    return tasks
+
 #for content generation
 class AIAssistant:
     def __init__(self):
@@ -17,280 +339,213 @@ class AIAssistant:
             self.model = 'fallback'
         else:
             try:
-                # Create a clean httpx client without proxy settings to avoid conflicts
-                # This works around an issue where the OpenAI library tries to pass
-                # proxy settings that httpx doesn't accept in this version
-                http_client = httpx.Client(timeout=60.0)
-                self.client = OpenAI(api_key=api_key, http_client=http_client)
+                self.client = OpenAI(api_key=api_key, http_client=_HTTP_CLIENT, max_retries=0)
                 self.model = model
             except Exception as e:
                 print(f"⚠️  Failed to initialize OpenAI client: {e}. Using fallback responses.")
                 self.client = None
                 self.model = 'fallback'
+        
+        self.max_tokens = _MAX_TOKENS.get(self.model, _DEFAULT_MAX_TOKENS)
     
     def generate_project_brief(self, project_name: str, user_input: str) -> Dict[str, str]:
         """
         Generate a comprehensive project brief from user input
         """
-        prompt = f"""
-        You are an expert project manager and business strategist. Based on the project name "{project_name}" and the following user input, create a comprehensive project brief.
-
-        User Input: {user_input}
-
-        Please provide a structured project brief with the following sections:
-        1. Vision: A clear, inspiring vision statement for the project
-        2. Problems: The specific problems this project aims to solve
-        3. Timeline: Suggested timeline with key phases
-        4. Impact: Expected business impact and outcomes
-        5. Goals: Specific, measurable goals for the project
-
-        Format your response as a JSON object with these exact keys: vision, problems, timeline, impact, goals
-        Each value should be a well-written paragraph (2-4 sentences).
-        """
-        
-        # Check if client is available
-        if not self.client:
-            print("OpenAI client not available, using fallback brief")
+        if not _has_signal(user_input):
             return self._get_fallback_brief(project_name, user_input)
         
-        # Try with retry logic
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "You are an expert project manager who creates comprehensive, actionable project briefs. Always respond with valid JSON."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.7,
-                    max_tokens=1000
-                )
-                
-                content = response.choices[0].message.content.strip()
-                # Try to parse as JSON, fallback to structured text if needed
-                try:
-                    return json.loads(content)
-                except json.JSONDecodeError:
-                    # If not valid JSON, create a structured response
-                    return self._parse_text_to_brief(content)
-                    
-            except Exception as e:
-                error_msg = str(e)
-                print(f"AI Service Error (attempt {attempt + 1}/{max_retries}): {e}")
-                
-                # Check for specific error types
-                if "insufficient_quota" in error_msg or "quota" in error_msg.lower():
-                    print("⚠️  OpenAI API quota exceeded. Please check your billing and add credits.")
-                    print("💡 Using dynamic fallback instead of retrying quota errors.")
-                    return self._get_fallback_brief(project_name, user_input)
-                elif "rate_limit" in error_msg.lower():
-                    print("⚠️  Rate limit hit. Waiting longer before retry...")
-                    if attempt < max_retries - 1:
-                        time.sleep(5)  # Wait 5 seconds for rate limits
-                        continue
-                elif attempt < max_retries - 1:
-                    time.sleep(1)  # Wait 1 second before retry for other errors
-                    continue
-                else:
-                    print("All retry attempts failed, using dynamic fallback")
-                    return self._get_fallback_brief(project_name, user_input)
+        return self._call_with_fallback(
+            BRIEF_SYSTEM_PROMPT,
+            BRIEF_INPUT_TEMPLATE.format(project_name=project_name, user_input=user_input),
+            max_tokens=self.max_tokens['brief'],
+            json_mode=True,
+            parse=_parse_brief,
+            fallback=lambda: self._get_fallback_brief(project_name, user_input)
+        )
     
     def generate_starter_project_plan(self, project_name: str, project_brief: Dict[str, str]) -> List[Dict[str, str]]:
         """
         Generate a starter project plan with tasks based on the project brief
         """
-        brief_text = f"""
-        Project: {project_name}
-        Vision: {project_brief.get('vision', '')}
-        Problems: {project_brief.get('problems', '')}
-        Timeline: {project_brief.get('timeline', '')}
-        Impact: {project_brief.get('impact', '')}
-        Goals: {project_brief.get('goals', '')}
-        """
-        
-        prompt = f"""
-        You are an expert project manager. Based on the following project brief, create a starter project plan with 5-8 high-level tasks that would be needed to execute this project.
-
-        {brief_text}
-
-        For each task, provide:
-        - title: A clear, actionable task title
-        - description: A detailed description of what needs to be done
-        - priority: high, medium, or low
-        - size: small, medium, or large
-        - estimated_duration: Number of days (1-30)
-        - suggested_start_offset: Days from project start (0-30)
-
-        Format your response as a JSON array of objects with these exact keys: title, description, priority, size, estimated_duration, suggested_start_offset
-        """
-        
-        # Check if client is available
-        if not self.client:
-            print("OpenAI client not available, using fallback tasks")
+        if not _has_signal(' '.join(str(value) for value in project_brief.values() if value)):
             return self._get_fallback_tasks(project_name)
         
-        # Try with retry logic
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "You are an expert project manager who creates practical, actionable project plans. Always respond with valid JSON arrays."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.7,
-                    max_tokens=1500
-                )
-                
-                content = response.choices[0].message.content.strip()
-                try:
-                    tasks = json.loads(content)
-                    return tasks if isinstance(tasks, list) else []
-                except json.JSONDecodeError:
-                    return self._parse_text_to_tasks(content)
-                    
-            except Exception as e:
-                error_msg = str(e)
-                print(f"AI Service Error (attempt {attempt + 1}/{max_retries}): {e}")
-                
-                # Check for specific error types
-                if "insufficient_quota" in error_msg or "quota" in error_msg.lower():
-                    print("⚠️  OpenAI API quota exceeded. Please check your billing and add credits.")
-                    print("💡 Using dynamic fallback instead of retrying quota errors.")
-                    return self._get_fallback_tasks(project_name)
-                elif "rate_limit" in error_msg.lower():
-                    print("⚠️  Rate limit hit. Waiting longer before retry...")
-                    if attempt < max_retries - 1:
-                        time.sleep(5)  # Wait 5 seconds for rate limits
-                        continue
-                elif attempt < max_retries - 1:
-                    time.sleep(1)  # Wait 1 second before retry for other errors
-                    continue
-                else:
-                    print("All retry attempts failed, using dynamic fallback")
-                    return self._get_fallback_tasks(project_name)
+        prompt = PLAN_INPUT_TEMPLATE.format(
+            project_name=project_name,
+            vision=project_brief.get('vision', ''),
+            problems=project_brief.get('problems', ''),
+            timeline=project_brief.get('timeline', ''),
+            impact=project_brief.get('impact', ''),
+            goals=project_brief.get('goals', '')
+        )
+        return self._call_with_fallback(
+            PLAN_SYSTEM_PROMPT,
+            prompt,
+            max_tokens=self.max_tokens['plan'],
+            json_mode=True,
+            parse=_parse_plan,
+            fallback=lambda: self._get_fallback_tasks(project_name)
+        )
     
     def generate_project_summary(self, project_name: str, tasks: List[Dict], project_brief: Dict[str, str]) -> str:
         """
         Generate an AI-driven project summary
         """
-        tasks_summary = "\n".join([f"- {task.get('title', 'Unknown Task')}: {task.get('status', 'Unknown Status')}" for task in tasks])
-        
-        prompt = f"""
-        You are an expert project manager. Create a concise, professional project summary for "{project_name}".
-
-        Project Brief:
-        Vision: {project_brief.get('vision', 'Not specified')}
-        Goals: {project_brief.get('goals', 'Not specified')}
-
-        Current Tasks:
-        {tasks_summary}
-
-        Provide a 2-3 paragraph summary that includes:
-        1. Project overview and objectives
-        2. Current status and key activities
-        3. Next steps and priorities
-
-        Keep it professional and actionable.
+        return self._call_with_fallback(
+            SUMMARY_SYSTEM_PROMPT,
+            self._summary_prompt(project_name, tasks, project_brief),
+            max_tokens=self.max_tokens['summary'],
+            parse=str,
+            fallback=lambda: self._get_fallback_summary(project_name, tasks, project_brief)
+        )
+    
+    def stream_project_summary(self, project_name: str, tasks: List[Dict], project_brief: Dict[str, str]) -> Iterator[str]:
         """
+        Generate an AI-driven project summary as an iterator of text chunks
         
-        # Check if client is available
+        The model stream is opened before this returns, so errors up to that
+        point reach the caller; only the text itself is produced lazily.
+        """
         if not self.client:
             print("OpenAI client not available, using fallback summary")
-            return self._get_fallback_summary(project_name, tasks, project_brief)
+            return iter((self._get_fallback_summary(project_name, tasks, project_brief),))
+        
+        prompt = self._summary_prompt(project_name, tasks, project_brief)
+        cache_key = _response_cache_key(self.model, SUMMARY_SYSTEM_PROMPT, prompt)
+        content = _cached_response(cache_key)
+        if content is not None:
+            return iter((content,))
+        
+        # Retry only while opening the stream; once text has been sent it can't be taken back
+        stream = self._with_retries(lambda: self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=self.max_tokens['summary'],
+            stream=True
+        ))
+        if stream is None:
+            return iter((self._get_fallback_summary(project_name, tasks, project_brief),))
+        
+        return self._relay_summary_stream(stream, cache_key, project_name, tasks, project_brief)
+    
+    def _relay_summary_stream(self, stream, cache_key: str, project_name: str, tasks: List[Dict],
+                              project_brief: Dict[str, str]) -> Iterator[str]:
+        """Yield the summary text from an open model stream"""
+        parts = []
+        finish_reason = None
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                if choice.delta.content:
+                    parts.append(choice.delta.content)
+                    yield choice.delta.content
+                finish_reason = choice.finish_reason or finish_reason
+        except Exception as e:
+            print(f"AI Service Error while streaming summary: {e}")
+            # The response has already started, so the error has to be shown in the text
+            if parts:
+                yield "\n\n[summary interrupted]"
+            else:
+                yield self._get_fallback_summary(project_name, tasks, project_brief)
+            return
+        
+        if finish_reason == 'stop':
+            _cache_response(cache_key, ''.join(parts).strip())
+    
+    def _summary_prompt(self, project_name: str, tasks: List[Dict], project_brief: Dict[str, str]) -> str:
+        """Build the user message for the summary prompts"""
+        shown = heapq.nsmallest(SUMMARY_MAX_TASKS, tasks, key=_summary_relevance)
+        tasks_summary = "\n".join(f"- {task.get('title', 'Unknown Task')}: {task.get('status', 'Unknown Status')}" for task in shown)
+        if len(tasks) > len(shown):
+            tasks_summary += f"\n- ...and {len(tasks) - len(shown)} more tasks"
         
-        # Try with retry logic
-        max_retries = 3
-        for attempt in range(max_retries):
+        return SUMMARY_INPUT_TEMPLATE.format(
+            project_name=project_name,
+            vision=project_brief.get('vision', 'Not specified'),
+            goals=project_brief.get('goals', 'Not specified'),
+            tasks_summary=tasks_summary
+        )
+    
+    def _call_with_fallback(self, system_prompt: str, prompt: str, *, max_tokens: int,
+                            parse: Callable[[str], T], fallback: Callable[[], T],
+                            json_mode: bool = False) -> T:
+        """Return parse() of the model's reply, or fallback() when the AI service can't provide one"""
+        if not self.client:
+            print("OpenAI client not available, using dynamic fallback")
+            return fallback()
+        
+        content = self._with_retries(lambda: self._complete(system_prompt, prompt, max_tokens, json_mode))
+        if content is None:
+            return fallback()
+        
+        try:
+            return parse(content)
+        except ValueError as e:
+            # Cut off at max_tokens, or valid JSON without the requested keys
+            print(f"AI reply could not be parsed ({e}), using dynamic fallback")
+            return fallback()
+    
+    def _with_retries(self, call: Callable[[], T]) -> Optional[T]:
+        """Run call() under the retry policy; None means give up and use the fallback"""
+        for attempt in range(MAX_RETRIES):
             try:
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "You are an expert project manager who creates clear, actionable project summaries."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.7,
-                    max_tokens=500
-                )
-                
-                return response.choices[0].message.content.strip()
+                return call()
                 
             except Exception as e:
-                error_msg = str(e)
-                print(f"AI Service Error (attempt {attempt + 1}/{max_retries}): {e}")
+                print(f"AI Service Error (attempt {attempt + 1}/{MAX_RETRIES}): {e}")
                 
-                # Check for specific error types
-                if "insufficient_quota" in error_msg or "quota" in error_msg.lower():
+                if isinstance(e, RateLimitError) and e.code == 'insufficient_quota':
                     print("⚠️  OpenAI API quota exceeded. Please check your billing and add credits.")
                     print("💡 Using dynamic fallback instead of retrying quota errors.")
-                    return self._get_fallback_summary(project_name, tasks, project_brief)
-                elif "rate_limit" in error_msg.lower():
-                    print("⚠️  Rate limit hit. Waiting longer before retry...")
-                    if attempt < max_retries - 1:
-                        time.sleep(5)  # Wait 5 seconds for rate limits
-                        continue
-                elif attempt < max_retries - 1:
-                    time.sleep(1)  # Wait 1 second before retry for other errors
+                    return None
+                if _is_retryable(e) and attempt < MAX_RETRIES - 1:
+                    time.sleep(_retry_delay(attempt, e))
                     continue
-                else:
-                    print("All retry attempts failed, using dynamic fallback")
-                    return self._get_fallback_summary(project_name, tasks, project_brief)
+                print("Giving up on the AI service, using dynamic fallback")
+                return None
     
-    def _parse_text_to_brief(self, text: str) -> Dict[str, str]:
-        """Parse text response into structured brief"""
-        lines = text.split('\n')
-        brief = {}
-        current_section = None
-        current_content = []
+    def _complete(self, system_prompt: str, prompt: str, max_tokens: int, json_mode: bool = False) -> str:
+        """Return the model's reply to prompt, served from the response cache when possible"""
+        cache_key = _response_cache_key(self.model, system_prompt, prompt)
+        content = _cached_response(cache_key)
+        if content is not None:
+            return content
         
-        for line in lines:
-            line = line.strip()
-            if line.lower().startswith(('vision:', 'problems:', 'timeline:', 'impact:', 'goals:')):
-                if current_section:
-                    brief[current_section] = ' '.join(current_content)
-                current_section = line.split(':')[0].lower()
-                current_content = [line.split(':', 1)[1].strip()] if ':' in line else []
-            elif current_section and line:
-                current_content.append(line)
+        extra = {'response_format': {'type': 'json_object'}} if json_mode else {}
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=max_tokens,
+            **extra
+        )
         
-        if current_section:
-            brief[current_section] = ' '.join(current_content)
-        
-        return brief
-    
-    def _parse_text_to_tasks(self, text: str) -> List[Dict[str, str]]:
-        """Parse text response into task list"""
-        # Simple fallback parsing - in practice, you'd want more robust parsing
-        tasks = []
-        lines = text.split('\n')
-        
-        for line in lines:
-            if line.strip() and not line.strip().startswith('#'):
-                tasks.append({
-                    'title': line.strip(),
-                    'description': f'Task: {line.strip()}',
-                    'priority': 'medium',
-                    'size': 'medium',
-                    'estimated_duration': 5,
-                    'suggested_start_offset': len(tasks) * 2
-                })
-        
-        return tasks[:8]  # Limit to 8 tasks
+        choice = response.choices[0]
+        content = choice.message.content.strip()
+        # A reply cut off at max_tokens is incomplete, so don't serve it again
+        if choice.finish_reason == 'stop':
+            _cache_response(cache_key, content)
+        return content
     
     def _get_fallback_summary(self, project_name: str, tasks: List[Dict], project_brief: Dict[str, str]) -> str:
         """Generate dynamic fallback summary when AI service fails"""
         # Count tasks by status
-        task_counts = {}
-        for task in tasks:
-            status = task.get('status', 'unknown')
-            task_counts[status] = task_counts.get(status, 0) + 1
+        task_counts = Counter(task.get('status', 'unknown') for task in tasks)
         
         # Generate summary based on available data
         total_tasks = len(tasks)
-        completed_tasks = task_counts.get('completed', 0)
-        in_progress_tasks = task_counts.get('in_progress', 0)
+        completed_tasks = task_counts['completed']
+        in_progress_tasks = task_counts['in_progress']
         
         # Extract key information from project brief
         vision = project_brief.get('vision', 'Not specified')
@@ -315,16 +570,16 @@ Continue executing the remaining tasks according to the project plan. Focus on c
     def _get_fallback_brief(self, project_name: str, user_input: str) -> Dict[str, str]:
         """Generate dynamic fallback brief when AI service fails"""
         # Try to extract key information from user input
-        user_input_lower = user_input.lower()
+        words = _words(user_input)
         
         # Analyze user input for project type and context
-        if any(word in user_input_lower for word in ['website', 'web', 'app', 'application']):
+        if words & _DIGITAL_KEYWORDS:
             project_type = "digital product"
             timeline_hint = "typically 2-6 months depending on complexity"
-        elif any(word in user_input_lower for word in ['marketing', 'campaign', 'brand']):
+        elif words & _MARKETING_KEYWORDS:
             project_type = "marketing initiative"
             timeline_hint = "usually 1-3 months with ongoing optimization"
-        elif any(word in user_input_lower for word in ['process', 'workflow', 'system']):
+        elif words & _PROCESS_KEYWORDS:
             project_type = "process improvement"
             timeline_hint = "typically 1-4 months including implementation"
         else:
@@ -346,138 +601,20 @@ Continue executing the remaining tasks according to the project plan. Focus on c
     def _get_fallback_tasks(self, project_name: str) -> List[Dict[str, str]]:
         """Generate dynamic fallback tasks when AI service fails"""
         # Analyze project name for context
-        project_lower = project_name.lower()
+        words = _words(project_name)
         
         # Determine project type and adjust tasks accordingly
-        if any(word in project_lower for word in ['website', 'web', 'app', 'application']):
-            tasks = [
-                {
-                    'title': f'Project Planning for {project_name}',
-                    'description': 'Define project scope, technical requirements, and development timeline',
-                    'priority': 'high',
-                    'size': 'medium',
-                    'estimated_duration': 3,
-                    'suggested_start_offset': 0
-                },
-                {
-                    'title': 'Technical Architecture Design',
-                    'description': 'Design system architecture, database schema, and technical specifications',
-                    'priority': 'high',
-                    'size': 'medium',
-                    'estimated_duration': 5,
-                    'suggested_start_offset': 3
-                },
-                {
-                    'title': 'Development and Implementation',
-                    'description': 'Build core functionality and features according to specifications',
-                    'priority': 'high',
-                    'size': 'large',
-                    'estimated_duration': 15,
-                    'suggested_start_offset': 8
-                },
-                {
-                    'title': 'Testing and Quality Assurance',
-                    'description': 'Perform comprehensive testing including unit, integration, and user acceptance testing',
-                    'priority': 'high',
-                    'size': 'medium',
-                    'estimated_duration': 5,
-                    'suggested_start_offset': 23
-                },
-                {
-                    'title': 'Deployment and Launch',
-                    'description': 'Deploy to production environment and conduct final launch activities',
-                    'priority': 'high',
-                    'size': 'small',
-                    'estimated_duration': 3,
-                    'suggested_start_offset': 28
-                }
-            ]
-        elif any(word in project_lower for word in ['marketing', 'campaign', 'brand']):
-            tasks = [
-                {
-                    'title': f'Strategy Development for {project_name}',
-                    'description': 'Develop marketing strategy, target audience analysis, and campaign objectives',
-                    'priority': 'high',
-                    'size': 'medium',
-                    'estimated_duration': 4,
-                    'suggested_start_offset': 0
-                },
-                {
-                    'title': 'Creative Development',
-                    'description': 'Create marketing materials, content, and creative assets',
-                    'priority': 'high',
-                    'size': 'medium',
-                    'estimated_duration': 6,
-                    'suggested_start_offset': 4
-                },
-                {
-                    'title': 'Campaign Implementation',
-                    'description': 'Execute marketing campaigns across selected channels and platforms',
-                    'priority': 'high',
-                    'size': 'large',
-                    'estimated_duration': 8,
-                    'suggested_start_offset': 10
-                },
-                {
-                    'title': 'Performance Monitoring',
-                    'description': 'Track campaign performance, analyze metrics, and optimize results',
-                    'priority': 'medium',
-                    'size': 'medium',
-                    'estimated_duration': 4,
-                    'suggested_start_offset': 18
-                },
-                {
-                    'title': 'Campaign Analysis and Reporting',
-                    'description': 'Compile results, insights, and recommendations for future campaigns',
-                    'priority': 'medium',
-                    'size': 'small',
-                    'estimated_duration': 2,
-                    'suggested_start_offset': 22
-                }
-            ]
+        if words & _DIGITAL_KEYWORDS:
+            template = _DIGITAL_FALLBACK_TASKS
+        elif words & _MARKETING_KEYWORDS:
+            template = _MARKETING_FALLBACK_TASKS
         else:
-            # Generic project tasks
-            tasks = [
-                {
-                    'title': f'Project Planning for {project_name}',
-                    'description': 'Define project scope, timeline, resources, and success criteria',
-                    'priority': 'high',
-                    'size': 'medium',
-                    'estimated_duration': 3,
-                    'suggested_start_offset': 0
-                },
-                {
-                    'title': 'Requirements Analysis',
-                    'description': 'Gather and document detailed project requirements and specifications',
-                    'priority': 'high',
-                    'size': 'medium',
-                    'estimated_duration': 5,
-                    'suggested_start_offset': 3
-                },
-                {
-                    'title': 'Project Execution',
-                    'description': 'Implement core project deliverables and manage day-to-day activities',
-                    'priority': 'high',
-                    'size': 'large',
-                    'estimated_duration': 12,
-                    'suggested_start_offset': 8
-                },
-                {
-                    'title': 'Quality Control and Testing',
-                    'description': 'Review deliverables, conduct quality checks, and validate outcomes',
-                    'priority': 'medium',
-                    'size': 'medium',
-                    'estimated_duration': 4,
-                    'suggested_start_offset': 20
-                },
-                {
-                    'title': 'Project Closure and Handover',
-                    'description': 'Finalize deliverables, conduct project review, and transfer ownership',
-                    'priority': 'high',
-                    'size': 'small',
-                    'estimated_duration': 2,
-                    'suggested_start_offset': 24
-                }
-            ]
+            template = _GENERAL_FALLBACK_TASKS
         
-        return tasks
\ No newline at end of file
+        return _materialize_tasks(template, project_name)
+
+
+@functools.cache
+def get_ai_assistant() -> AIAssistant:
+    """Return this process's AIAssistant, creating its OpenAI client on first use"""
+    return AIAssistant()
@@ -6,16 +6,212 @@ with fallback to SMTP for email.
 """
 
 import os
+import re
+import html
+import random
 import logging
-from typing import Dict, Any, Optional, List
-from datetime import datetime
+import threading
+import time
+from string import Template
+from typing import Dict, Any, Optional, List, Tuple
+
+# Import the ACS SDK once at module load instead of on every send
+try:
+    from azure.communication.email import EmailClient
+    from azure.communication.email.models import (
+        EmailMessage, EmailContent, EmailAddress, EmailRecipients
+    )
+    from azure.core.exceptions import HttpResponseError
+    ACS_AVAILABLE = True
+except ImportError:
+    ACS_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Throttled (429) and unavailable (503) sends are retried a couple of times
+# with jittered exponential backoff before callers fall back to SMTP
+SEND_MAX_ATTEMPTS = 3
+SEND_RETRY_BASE_DELAY = 0.5  # seconds
+SEND_RETRY_MAX_DELAY = 10.0  # seconds
+_RETRYABLE_STATUS_CODES = frozenset({429, 503})
+
+
+def _send_retry_delay(attempt: int, error: Exception) -> float:
+    """Seconds to wait before retrying after the given failed attempt"""
+    response = getattr(error, 'response', None)
+    if response is not None:
+        try:
+            retry_after = response.headers.get('retry-after')
+            if retry_after:
+                return min(float(retry_after), SEND_RETRY_MAX_DELAY)
+        except (AttributeError, ValueError):
+            pass  # HTTP-date Retry-After values fall back to backoff
+    return random.uniform(0, min(SEND_RETRY_MAX_DELAY, SEND_RETRY_BASE_DELAY * 2 ** attempt))
+
+# One EmailClient, and with it one HTTP connection pool, per connection
+# string per process instead of a new client (and TLS handshake) per sender
+_email_clients: Dict[str, Any] = {}
+_email_clients_lock = threading.Lock()
+
+
+def get_email_client(connection_string: str):
+    """Return the shared EmailClient for connection_string, creating it on first use"""
+    client = _email_clients.get(connection_string)
+    if client is None:
+        with _email_clients_lock:
+            client = _email_clients.get(connection_string)
+            if client is None:
+                if not ACS_AVAILABLE:
+                    raise ImportError("azure-communication-email is not installed")
+                client = EmailClient.from_connection_string(connection_string)
+                _email_clients[connection_string] = client
+    return client
+
+# Plain-text conversion: drop non-visible blocks (whose CSS would otherwise
+# leak into the text), then tags, then collapse whitespace
+_HIDDEN_BLOCK_RE = re.compile(r'<(head|style|script)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r'<[^<]+?>')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Email bodies are parsed once at import; each send only substitutes values
+_INVITATION_HTML_TEMPLATE = Template("""
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>Project Invitation</title>
+    <style>
+        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+        .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+        .header { background-color: #3B82F6; color: white; padding: 20px; text-align: center; }
+        .content { padding: 20px; background-color: #f9f9f9; }
+        .button { display: inline-block; padding: 12px 24px; background-color: #3B82F6; 
+                  color: white; text-decoration: none; border-radius: 5px; margin: 20px 0; }
+        .footer { padding: 20px; text-align: center; color: #666; font-size: 12px; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>Project Invitation</h1>
+        </div>
+        <div class="content">
+            <h2>You've been invited to collaborate!</h2>
+            <p><strong>$inviter_name</strong> has invited you to collaborate on the project <strong>"$project_name"</strong>.</p>
+            <p>You'll be able to <strong>$role_description</strong> as a <strong>$role</strong>.</p>
+            $personal_message_block
+            <p>Click the button below to accept the invitation:</p>
+            <a href="$invitation_url" class="button">Accept Invitation</a>
+            <p>Or copy and paste this link into your browser:</p>
+            <p style="word-break: break-all; background-color: #f0f0f0; padding: 10px;">$invitation_url</p>
+        </div>
+        <div class="footer">
+            <p>This invitation was sent by Rhythmic Project Manager</p>
+            <p>If you didn't expect this invitation, you can safely ignore this email.</p>
+        </div>
+    </div>
+</body>
+</html>
+""")
+
+_PERSONAL_MESSAGE_HTML_TEMPLATE = Template(
+    '<div style="background-color: #e3f2fd; padding: 15px; border-left: 4px solid #2196f3; margin: 20px 0;">'
+    '<p><em>"$personal_message"</em></p></div>'
+)
+
+# Plain-text parts mirror the HTML layout, so sends never need _html_to_plain
+_INVITATION_PLAIN_TEMPLATE = Template("""You've been invited to collaborate!
+
+$inviter_name has invited you to collaborate on the project "$project_name".
+You'll be able to $role_description as a $role.
+$personal_message_block
+Accept the invitation by opening this link in your browser:
+$invitation_url
+
+This invitation was sent by Rhythmic Project Manager
+If you didn't expect this invitation, you can safely ignore this email.
+""")
+
+_PERSONAL_MESSAGE_PLAIN_TEMPLATE = Template('\n"$personal_message"\n')
+
+_NOTIFICATION_HTML_TEMPLATE = Template("""
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>$template_name</title>
+    <style>
+        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+        .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+        .header { background-color: #3B82F6; color: white; padding: 20px; text-align: center; }
+        .content { padding: 20px; background-color: #f9f9f9; }
+        .footer { padding: 20px; text-align: center; color: #666; font-size: 12px; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>$template_name</h1>
+        </div>
+        <div class="content">
+            <h2>Project: $project_name</h2>
+            <p>$message</p>
+            <p>Timestamp: $timestamp UTC</p>
+        </div>
+        <div class="footer">
+            <p>This notification was sent by Rhythmic Project Manager</p>
+        </div>
+    </div>
+</body>
+</html>
+""")
+
+_NOTIFICATION_PLAIN_TEMPLATE = Template("""$template_name
+
+Project: $project_name
+$message
+Timestamp: $timestamp UTC
+
+This notification was sent by Rhythmic Project Manager
+""")
+
+
+def _escape_fields(fields: Dict[str, str]) -> Dict[str, str]:
+    """HTML-escape template values once per send; quotes too, since the
+    invitation URL is also placed in an href attribute"""
+    return {key: html.escape(value) for key, value in fields.items()}
+
+
+# What each collaborator role allows, as worded in invitation emails
+_ROLE_DESCRIPTIONS = {
+    'viewer': 'view the project and its tasks',
+    'editor': 'view, create, and edit tasks',
+    'admin': 'manage the project, tasks, and collaborators'
+}
+
+# Notification body per type, substituted from the event details
+_NOTIFICATION_MESSAGES = {
+    'invitation_accepted': Template("Your invitation has been accepted by $user_name."),
+    'invitation_declined': Template("Your invitation has been declined by $user_name."),
+    'role_changed': Template("Your role has been changed to $new_role."),
+    'access_revoked': Template("Your access to this project has been revoked."),
+    'project_shared': Template("Project has been shared with $recipient.")
+}
+
 
 class AzureCommunicationService:
     """Azure Communication Services integration"""
     
+    # Email subjects for different notification types
+    TEMPLATES = {
+        'invitation_sent': 'Project Invitation',
+        'invitation_accepted': 'Invitation Accepted',
+        'invitation_declined': 'Invitation Declined',
+        'role_changed': 'Role Updated',
+        'project_shared': 'Project Shared',
+        'access_revoked': 'Access Revoked'
+    }
+    
     def __init__(self, connection_string: str = None):
         self.connection_string = connection_string or os.environ.get('AZURE_COMMUNICATION_CONNECTION_STRING')
         # Use FROM_EMAIL as the primary sender email, fallback to AZURE_COMMUNICATION_SENDER_EMAIL
@@ -23,32 +219,26 @@ class AzureCommunicationService:
         self.enabled = bool(self.connection_string and self.sender_email)
         self.email_client = None
         
-        # Email templates for different notification types
-        self.templates = {
-            'invitation_sent': 'Project Invitation',
-            'invitation_accepted': 'Invitation Accepted',
-            'invitation_declined': 'Invitation Declined',
-            'role_changed': 'Role Updated',
-            'project_shared': 'Project Shared',
-            'access_revoked': 'Access Revoked'
-        }
+        if self.enabled and not ACS_AVAILABLE:
+            logger.warning("Azure Communication Services SDK not available")
+            self.enabled = False
         
         if self.enabled:
+            # The sender never changes, so build its address once
+            self._sender_address = EmailAddress(
+                email=self.sender_email,
+                display_name="Rhythmic Project Manager"
+            )
             self._initialize_client()
     
     def _initialize_client(self):
         """Initialize Azure Communication Services client"""
         try:
-            from azure.communication.email import EmailClient
-            
-            self.email_client = EmailClient.from_connection_string(self.connection_string)
+            self.email_client = get_email_client(self.connection_string)
             logger.info("Azure Communication Services client initialized successfully")
             
-        except ImportError:
-            logger.warning("Azure Communication Services SDK not available")
-            self.enabled = False
         except Exception as e:
-            logger.error(f"Failed to initialize Azure Communication Services: {e}")
+            logger.error("Failed to initialize Azure Communication Services: %s", e)
             self.enabled = False
     
     def is_available(self) -> bool:
@@ -66,16 +256,9 @@ class AzureCommunicationService:
             }
         
         try:
-            from azure.communication.email.models import (
-                EmailMessage, EmailContent, EmailAddress, EmailRecipients
-            )
-            
             # Create email message
             email_message = EmailMessage(
-                sender=EmailAddress(
-                    email=self.sender_email,
-                    display_name="Rhythmic Project Manager"
-                ),
+                sender=self._sender_address,
                 content=EmailContent(
                     subject=subject,
                     html=html_content,
@@ -87,10 +270,10 @@ class AzureCommunicationService:
             )
             
             # Send email
-            response = self.email_client.send(email_message)
+            response = self._send_with_retries(email_message)
             
             if response and hasattr(response, 'message_id'):
-                logger.info(f"Email sent successfully via Azure Communication Services: {response.message_id}")
+                logger.info("Email sent successfully via Azure Communication Services: %s", response.message_id)
                 return {
                     'success': True,
                     'message_id': response.message_id,
@@ -105,20 +288,34 @@ class AzureCommunicationService:
                 }
                 
         except Exception as e:
-            logger.error(f"Failed to send email via Azure Communication Services: {e}")
+            logger.error("Failed to send email via Azure Communication Services: %s", e)
             return {
                 'success': False,
                 'error': str(e),
                 'fallback_required': True
             }
     
+    def _send_with_retries(self, email_message):
+        """Send email_message, retrying throttled or unavailable responses"""
+        for attempt in range(SEND_MAX_ATTEMPTS):
+            try:
+                return self.email_client.send(email_message)
+                
+            except HttpResponseError as e:
+                if e.status_code not in _RETRYABLE_STATUS_CODES or attempt == SEND_MAX_ATTEMPTS - 1:
+                    raise
+                delay = _send_retry_delay(attempt, e)
+                logger.warning("Azure Communication Services returned %s, retrying in %.1fs (attempt %d/%d)",
+                               e.status_code, delay, attempt + 1, SEND_MAX_ATTEMPTS)
+                time.sleep(delay)
+    
     def send_invitation_email(self, to_email: str, project_name: str, 
                             inviter_name: str, role: str, invitation_url: str,
                             personal_message: str = "") -> Dict[str, Any]:
         """Send project invitation email"""
         subject = f"{inviter_name} invited you to collaborate on '{project_name}'"
         
-        html_content = self._generate_invitation_html(
+        html_content, plain_content = self._generate_invitation_content(
             project_name=project_name,
             inviter_name=inviter_name,
             role=role,
@@ -126,135 +323,81 @@ class AzureCommunicationService:
             personal_message=personal_message
         )
         
-        return self.send_email(to_email, subject, html_content)
+        return self.send_email(to_email, subject, html_content, plain_content)
     
     def send_notification_email(self, to_email: str, notification_type: str,
                               project_name: str, details: Dict[str, Any]) -> Dict[str, Any]:
         """Send notification email for various project events"""
-        template_name = self.templates.get(notification_type, 'Project Notification')
+        template_name = self.TEMPLATES.get(notification_type, 'Project Notification')
         subject = f"{template_name} - {project_name}"
         
-        html_content = self._generate_notification_html(
+        html_content, plain_content = self._generate_notification_content(
             notification_type=notification_type,
             project_name=project_name,
             details=details
         )
         
-        return self.send_email(to_email, subject, html_content)
+        return self.send_email(to_email, subject, html_content, plain_content)
     
-    def _generate_invitation_html(self, project_name: str, inviter_name: str,
-                                role: str, invitation_url: str, personal_message: str = "") -> str:
-        """Generate HTML content for invitation email"""
-        role_descriptions = {
-            'viewer': 'view the project and its tasks',
-            'editor': 'view, create, and edit tasks',
-            'admin': 'manage the project, tasks, and collaborators'
+    def _generate_invitation_content(self, project_name: str, inviter_name: str,
+                                     role: str, invitation_url: str,
+                                     personal_message: str = "") -> Tuple[str, str]:
+        """Generate HTML and plain-text content for invitation email"""
+        fields = {
+            'inviter_name': inviter_name,
+            'project_name': project_name,
+            'role_description': _ROLE_DESCRIPTIONS.get(role, 'collaborate on the project'),
+            'role': role,
+            'invitation_url': invitation_url,
+            'personal_message': personal_message
         }
         
-        role_description = role_descriptions.get(role, 'collaborate on the project')
+        html_fields = _escape_fields(fields)
         
-        html_template = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <title>Project Invitation</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background-color: #3B82F6; color: white; padding: 20px; text-align: center; }}
-                .content {{ padding: 20px; background-color: #f9f9f9; }}
-                .button {{ display: inline-block; padding: 12px 24px; background-color: #3B82F6; 
-                          color: white; text-decoration: none; border-radius: 5px; margin: 20px 0; }}
-                .footer {{ padding: 20px; text-align: center; color: #666; font-size: 12px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>Project Invitation</h1>
-                </div>
-                <div class="content">
-                    <h2>You've been invited to collaborate!</h2>
-                    <p><strong>{inviter_name}</strong> has invited you to collaborate on the project <strong>"{project_name}"</strong>.</p>
-                    <p>You'll be able to <strong>{role_description}</strong> as a <strong>{role}</strong>.</p>
-                    {f'<div style="background-color: #e3f2fd; padding: 15px; border-left: 4px solid #2196f3; margin: 20px 0;"><p><em>"{personal_message}"</em></p></div>' if personal_message else ''}
-                    <p>Click the button below to accept the invitation:</p>
-                    <a href="{invitation_url}" class="button">Accept Invitation</a>
-                    <p>Or copy and paste this link into your browser:</p>
-                    <p style="word-break: break-all; background-color: #f0f0f0; padding: 10px;">{invitation_url}</p>
-                </div>
-                <div class="footer">
-                    <p>This invitation was sent by Rhythmic Project Manager</p>
-                    <p>If you didn't expect this invitation, you can safely ignore this email.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
+        if personal_message:
+            html_block = _PERSONAL_MESSAGE_HTML_TEMPLATE.substitute(html_fields)
+            plain_block = _PERSONAL_MESSAGE_PLAIN_TEMPLATE.substitute(fields)
+        else:
+            html_block = plain_block = ''
         
-        return html_template
+        return (
+            _INVITATION_HTML_TEMPLATE.substitute(html_fields, personal_message_block=html_block),
+            _INVITATION_PLAIN_TEMPLATE.substitute(fields, personal_message_block=plain_block)
+        )
     
-    def _generate_notification_html(self, notification_type: str, project_name: str,
-                                  details: Dict[str, Any]) -> str:
-        """Generate HTML content for notification emails"""
-        template_name = self.templates.get(notification_type, 'Project Notification')
-        
-        html_template = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <title>{template_name}</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background-color: #3B82F6; color: white; padding: 20px; text-align: center; }}
-                .content {{ padding: 20px; background-color: #f9f9f9; }}
-                .footer {{ padding: 20px; text-align: center; color: #666; font-size: 12px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>{template_name}</h1>
-                </div>
-                <div class="content">
-                    <h2>Project: {project_name}</h2>
-                    <p>{self._get_notification_message(notification_type, details)}</p>
-                    <p>Timestamp: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC</p>
-                </div>
-                <div class="footer">
-                    <p>This notification was sent by Rhythmic Project Manager</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
+    def _generate_notification_content(self, notification_type: str, project_name: str,
+                                       details: Dict[str, Any]) -> Tuple[str, str]:
+        """Generate HTML and plain-text content for notification emails"""
+        fields = {
+            'template_name': self.TEMPLATES.get(notification_type, 'Project Notification'),
+            'project_name': project_name,
+            'message': self._get_notification_message(notification_type, details),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+        }
         
-        return html_template
+        return (
+            _NOTIFICATION_HTML_TEMPLATE.substitute(_escape_fields(fields)),
+            _NOTIFICATION_PLAIN_TEMPLATE.substitute(fields)
+        )
     
     def _get_notification_message(self, notification_type: str, details: Dict[str, Any]) -> str:
         """Get notification message based on type"""
-        messages = {
-            'invitation_accepted': f"Your invitation has been accepted by {details.get('user_name', 'a user')}.",
-            'invitation_declined': f"Your invitation has been declined by {details.get('user_name', 'a user')}.",
-            'role_changed': f"Your role has been changed to {details.get('new_role', 'unknown')}.",
-            'access_revoked': "Your access to this project has been revoked.",
-            'project_shared': f"Project has been shared with {details.get('recipient', 'collaborators')}."
-        }
+        template = _NOTIFICATION_MESSAGES.get(notification_type)
+        if template is None:
+            return f"Project notification: {notification_type}"
         
-        return messages.get(notification_type, f"Project notification: {notification_type}")
+        return template.safe_substitute(
+            user_name=details.get('user_name', 'a user'),
+            new_role=details.get('new_role', 'unknown'),
+            recipient=details.get('recipient', 'collaborators')
+        )
     
     def _html_to_plain(self, html_content: str) -> str:
         """Convert HTML content to plain text (basic implementation)"""
         try:
-            import re
-            # Remove HTML tags
-            plain = re.sub('<[^<]+?>', '', html_content)
-            # Clean up whitespace
-            plain = re.sub(r'\s+', ' ', plain).strip()
-            return plain
+            plain = _HIDDEN_BLOCK_RE.sub(' ', html_content)
+            plain = _TAG_RE.sub('', plain)
+            return _WHITESPACE_RE.sub(' ', html.unescape(plain)).strip()
         except:
             return "Please view this email in HTML format."
     
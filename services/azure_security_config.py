@@ -10,10 +10,49 @@ Provides security enhancements for Azure deployment including:
 
 import os
 import logging
+import functools
 from typing import Dict, Any
 
 logger = logging.getLogger(__name__)
 
+# Headers added to every response on Azure
+_SECURITY_HEADERS = {
+    # HTTPS enforcement
+    'Strict-Transport-Security': 'max-age=31536000; includeSubDomains',
+    # Content security
+    'X-Content-Type-Options': 'nosniff',
+    'X-Frame-Options': 'DENY',
+    'X-XSS-Protection': '1; mode=block',
+    # Referrer policy
+    'Referrer-Policy': 'strict-origin-when-cross-origin',
+}
+
+
+class SecurityHeadersMiddleware:
+    """WSGI middleware that sets fixed headers on every response.
+    
+    Works on the raw header list passed to start_response, so no Flask
+    response object is touched. Like headers.update(), it replaces any
+    header of the same name that the app already set.
+    """
+    
+    def __init__(self, app, headers: Dict[str, str]):
+        self.app = app
+        self._names = frozenset(name.lower() for name in headers)
+        self._headers = list(headers.items())
+    
+    def __call__(self, environ, start_response):
+        def _start_response(status, response_headers, exc_info=None):
+            response_headers = [h for h in response_headers if h[0].lower() not in self._names]
+            response_headers.extend(self._headers)
+            return start_response(status, response_headers, exc_info)
+        
+        return self.app(environ, _start_response)
+
+# App Service settings are fixed for the life of the process, so the CORS
+# origins are split once at import
+_CORS_ORIGINS = tuple(os.environ.get('CORS_ORIGINS', '*').split(','))
+
 
 def configure_app_for_azure(app):
     """Configure Flask app with Azure security settings"""
@@ -23,37 +62,12 @@ def configure_app_for_azure(app):
         app.config['PREFERRED_URL_SCHEME'] = 'https'
         
         # Add security headers middleware
-        @app.after_request
-        def add_security_headers(response):
-            # HTTPS enforcement
-            response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
-            
-            # Content security
-            response.headers['X-Content-Type-Options'] = 'nosniff'
-            response.headers['X-Frame-Options'] = 'DENY'
-            response.headers['X-XSS-Protection'] = '1; mode=block'
-            
-            # Referrer policy
-            response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
-            
-            # WebSocket headers for SocketIO (only for JSON responses to avoid static file issues)
-            if (hasattr(response, 'mimetype') and 
-                response.mimetype == 'application/json'):
-                try:
-                    if 'socket.io' in str(response.get_data()):
-                        response.headers['Connection'] = 'Upgrade'
-                        response.headers['Upgrade'] = 'websocket'
-                except RuntimeError:
-                    # Skip if response is in passthrough mode (static files)
-                    pass
-            
-            return response
+        app.wsgi_app = SecurityHeadersMiddleware(app.wsgi_app, _SECURITY_HEADERS)
         
         logger.info("Azure security headers configured")
     
     # Configure CORS for Azure
-    cors_origins = os.environ.get('CORS_ORIGINS', '*').split(',')
-    app.config['CORS_ORIGINS'] = cors_origins
+    app.config['CORS_ORIGINS'] = list(_CORS_ORIGINS)
     
     # Session security
     app.config['SESSION_COOKIE_SECURE'] = is_azure_environment()
@@ -64,6 +78,7 @@ def configure_app_for_azure(app):
     return app
 
 
+@functools.lru_cache(maxsize=1)
 def is_azure_environment() -> bool:
     """Check if running in Azure environment"""
     azure_indicators = [
@@ -80,6 +95,6 @@ def get_security_config() -> Dict[str, Any]:
         'is_azure': is_azure_environment(),
         'https_enforced': is_azure_environment(),
         'security_headers_enabled': is_azure_environment(),
-        'cors_origins': os.environ.get('CORS_ORIGINS', '*').split(','),
+        'cors_origins': list(_CORS_ORIGINS),
         'session_secure': is_azure_environment()
     }
\ No newline at end of file
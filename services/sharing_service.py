@@ -394,14 +394,14 @@ class SharingService:
         """
         try:
             # Try to import Azure Communication Services
-            from azure.communication.email import EmailClient
             from azure.communication.email.models import EmailMessage, EmailContent, EmailAddress, EmailRecipients
+            from services.azure_communication_service import get_email_client
             
             if not self.azure_comm_connection_string or not self.azure_comm_sender_email:
                 raise EmailDeliveryError("Azure Communication Services not properly configured")
             
-            # Create email client
-            email_client = EmailClient.from_connection_string(self.azure_comm_connection_string)
+            # Reuse the process-wide email client and its connection pool
+            email_client = get_email_client(self.azure_comm_connection_string)
             
             # Create email message
             email_message = EmailMessage(